@@ -37,7 +37,7 @@ def setup_spectre():
             ('share', [
                 'share/dalton_loprop.bash',
                 'share/dalton_pde_monomer.bash', 'share/dalton_pde_dimer.bash',
-                'share/dalton_excited.bash'
+                'share/dalton_excited.bash', 'share/spectre_bundle.bash'
             ]),
             ('share/ml', [
                 'share/ml/WAT.npz',
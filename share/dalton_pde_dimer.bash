@@ -47,11 +47,11 @@ then
     if [ ! -e $WORK_DIR/$JOB.out ]
     then
         # but only if there is no output file
-        $PROGPATH/dalton -mb $MEMORY -d -noarch -nobackup -noappend -get '$JOB.h5' -put '$JOB.h5' -o $JOB.out -dal $JOB.dal > $JOB.dalout
-        #$PROGPATH/dalton -mb $MEMORY -d -noarch -nobackup -noappend -get '$JOB.h5' -put '$JOB.h5' -o $JOB.out -dal $JOB.dal -pot temp.pot > $JOB.dalout
-        if [ -e ${JOB}.$JOB.h5 ]
+        # the .pot file contains coordinates of ALL polarizable sites
+        $PROGPATH/dalton -mb $MEMORY -d -noarch -nobackup -noappend -get '$JOB.h5' -put '$JOB.h5' -o $JOB.out -dal $JOB.dal -pot temp.pot > $JOB.dalout
+        if [ -e ${JOB}__temp.$JOB.h5 ]
         then
-            mv ${JOB}.$JOB.h5 $JOB.h5
+            mv ${JOB}__temp.$JOB.h5 $JOB.h5
         else
             echo "Output from PDE dimer calculation $JOB is missing."
         fi
@@ -29,18 +29,20 @@ export OMP_NUM_THREADS=1
 
 # run the calculation
 
-# the .pot file contains coordinates of ALL polarizable sites
+# the monomer density does not depend on the chromophore so no
+# polarizable sites (.pot file) are given here. They are added in
+# the dimer calculation instead.
 if [ -e $WORK_DIR/$JOB.h5 ]
 then
     # if the .h5 file exists we will with a calculation using it
     if [ ! -e $WORK_DIR/$JOB.out ]
     then
         # but only if there is no output file
-        $PROGPATH/dalton -mb $MEMORY -d -noarch -nobackup -noappend -get '$JOB.h5' -put '$JOB.h5' -o $JOB.out -dal $JOB.dal -pot temp.pot > $JOB.dalout
+        $PROGPATH/dalton -mb $MEMORY -d -noarch -nobackup -noappend -get '$JOB.h5' -put '$JOB.h5' -o $JOB.out -dal $JOB.dal > $JOB.dalout
 
-        if [ -e ${JOB}__temp.$JOB.h5 ]
+        if [ -e ${JOB}.$JOB.h5 ]
         then
-            mv ${JOB}__temp.$JOB.h5 $JOB.h5
+            mv ${JOB}.$JOB.h5 $JOB.h5
         else
             echo "Output from PDE monomer calculation $JOB is missing."
         fi
@@ -0,0 +1,17 @@
+#!/usr/bin/env bash
+# runs a bundle of small jobs one after the other
+#
+# options to be substituted
+#  WORK_DIR: $WORK_DIR
+#  JOB     : $JOB
+#  MEMORY  : $MEMORY
+#  NCPUS   : $NCPUS
+#
+
+export PATH=$PATH
+export LD_LIBRARY_PATH=$LD_LIBRARY_PATH
+
+# the run scripts of the members are inlined in $JOB.bundle (written by
+# SPECTRE) and take their memory from MEMORY
+MEMORY=$MEMORY
+. $WORK_DIR/$JOB.bundle
@@ -0,0 +1,317 @@
+""" Indexed archive of the working directories of a calculation
+
+The files of all working directories of a system are kept in a set of
+zip archives (chunks). The central directories of the chunks are the
+index so a single file can be read without extracting anything else.
+
+Every file is compressed on its own (gzip) by a pool of threads and
+stored uncompressed in the archive with a ".gz" suffix. Members are
+(de)compressed transparently by :class:`WorkspaceArchive`.
+
+Adding directories writes a new chunk next to the existing ones, so it
+does not depend on the size of the archive. A chunk is written to a
+temporary file first and only moved in place once it is complete, so
+a run that is stopped while it adds files never damages the files that
+are already archived. Chunks are numbered in the order they are added
+and a file in a later chunk shadows the copies in earlier chunks. The
+chunks are merged into one (compacted) once the shadowed copies take up
+more than half of the archive or there are too many chunks.
+"""
+import collections
+import concurrent.futures
+import gzip
+import io
+import os
+import tempfile
+import threading
+import warnings
+import zipfile
+
+COMPRESSED_SUFFIX = ".gz"
+
+# number of chunks that trigger a compaction of the archive
+MAX_CHUNKS = 64
+
+
+class WorkspaceArchive(object):
+    """ An archive of files relative to a base directory """
+
+    def __init__(self, filename):
+        """ Initializes the archive. It is created when files are added.
+
+            :param filename: the archive file. Chunks are named after it (filename.1, filename.2 and so on).
+            :type filename: str
+        """
+        self.filename = os.path.abspath(filename)
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()  # chunks are added (or merged) one at a time
+        self._chunks = None  # chunk filename -> open zip file
+        self._index = None  # name -> (chunk filename, zip entry)
+        self._directories = None  # top-level directory -> names of its files
+        self._shadowed_size = 0
+
+    def chunk_filenames(self):
+        """ Returns the chunks of the archive in the order they were added
+
+            An archive written as a single file (without a number) is the
+            oldest chunk.
+
+            :rtype: list[str]
+        """
+        return [filename for _, filename in self._numbered_chunks()]
+
+    def _numbered_chunks(self):
+        directory, basename = os.path.split(self.filename)
+        chunks = []
+        if os.path.isdir(directory):
+            for filename in os.listdir(directory):
+                number = filename[len(basename) + 1:]
+                if filename == basename:
+                    chunks.append((0, self.filename))
+                elif filename.startswith(basename + ".") and number.isdigit():
+                    chunks.append((int(number), os.path.join(directory, filename)))
+        return sorted(chunks)
+
+    def _get_index(self):
+        """ Returns the archived members (name -> chunk and zip entry), read on first use
+
+            The last entry of a file shadows earlier ones.
+        """
+        with self._lock:
+            if self._index is None:
+                self._chunks = collections.OrderedDict()
+                self._index = {}
+                self._directories = collections.defaultdict(set)
+                self._shadowed_size = 0
+                for chunk in self.chunk_filenames():
+                    self._add_chunk(chunk)
+            return self._index
+
+    def _add_chunk(self, chunk):
+        if not zipfile.is_zipfile(chunk):  # never written by this class but it must not stop a calculation
+            warnings.warn("Ignoring damaged archive '{0:s}'.".format(chunk))
+            return
+
+        archive = zipfile.ZipFile(chunk, 'r')
+        self._chunks[chunk] = archive
+        for info in archive.infolist():
+            name = member_name(info.filename)
+            if name in self._index:
+                self._shadowed_size += self._index[name][1].compress_size
+            self._index[name] = (chunk, info)
+            self._directories[name.split("/", 1)[0]].add(name)
+
+    def __contains__(self, member):
+        return member in self._get_index()
+
+    def names(self):
+        """ Returns the names of the archived files
+
+            :rtype: list[str]
+        """
+        with self._lock:
+            return sorted(self._get_index())
+
+    def directories(self):
+        """ Returns the names of the archived (top-level) directories
+
+            :rtype: list[str]
+        """
+        with self._lock:
+            self._get_index()
+            return sorted(self._directories)
+
+    def directory_names(self, directory):
+        """ Returns the names of the archived files in a directory
+
+            :param directory: the directory (relative to the base directory)
+            :type directory: str
+            :rtype: list[str]
+        """
+        prefix = directory.rstrip("/") + "/"
+        with self._lock:
+            self._get_index()
+            names = self._directories.get(prefix.split("/", 1)[0], ())
+            return sorted(name for name in names if name.startswith(prefix))
+
+    def get_size(self):
+        """ Returns the size of all chunks in bytes """
+        return sum(os.path.getsize(chunk) for chunk in self.chunk_filenames())
+
+    def read(self, member):
+        """ Reads an archived file
+
+            :param member: the name of the file
+            :type member: str
+            :raises FileNotFoundError: if the file is not in the archive
+            :rtype: bytes
+        """
+        with self._lock:  # the archive may be compacted by another thread
+            index = self._get_index()
+            if member not in index:
+                raise FileNotFoundError("No such file in archive '{0:s}': '{1:s}'".format(self.filename, member))
+            chunk, info = index[member]
+            data = self._chunks[chunk].read(info)
+        if info.filename.endswith(COMPRESSED_SUFFIX):
+            data = gzip.decompress(data)
+        return data
+
+    def open(self, member, mode='r'):
+        """ Opens an archived file for reading
+
+            :param member: the name of the file
+            :type member: str
+            :param mode: 'r' for text and 'rb' for binary access
+            :type mode: str
+            :rtype: io.IOBase
+        """
+        data = io.BytesIO(self.read(member))
+        if 'b' in mode:
+            return data
+        return io.TextIOWrapper(data)
+
+    def update(self, root, directories, num_threads=1, compresslevel=6):
+        """ Adds (or replaces) the files of directories in the archive
+
+            The files are written to a new chunk. Files of other
+            directories already in the archive are kept. The archive can
+            be read while the files are compressed.
+
+            :param root: the base directory
+            :type root: str
+            :param directories: the directories (relative to the base directory) to add
+            :type directories: list[str]
+            :param num_threads: number of threads compressing the files
+            :type num_threads: int
+            :param compresslevel: the gzip compression level
+            :type compresslevel: int
+        """
+        members = []
+        for directory in directories:
+            for path, _, filenames in os.walk(os.path.join(root, directory)):
+                for filename in sorted(filenames):
+                    full_filename = os.path.join(path, filename)
+                    members.append(os.path.relpath(full_filename, root).replace(os.sep, "/"))
+        if len(members) == 0:
+            return
+
+        with self._write_lock:
+            self._update(root, members, num_threads, compresslevel)
+
+    def _update(self, root, members, num_threads, compresslevel):
+        temp_filename = self._temp_filename()
+        try:
+            with zipfile.ZipFile(temp_filename, 'w', zipfile.ZIP_STORED, allowZip64=True) as archive:
+                with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, num_threads)) as executor:
+                    filenames = [os.path.join(root, member) for member in members]
+                    compressed = _bounded_map(executor, _compress_file, filenames, 2 * max(1, num_threads),
+                                              compresslevel)
+                    for member, data in zip(members, compressed):
+                        archive.writestr(member + COMPRESSED_SUFFIX, data)
+            _sync(temp_filename)
+        except BaseException:
+            os.remove(temp_filename)
+            raise
+
+        with self._lock:
+            self._get_index()
+            chunk = self._next_chunk_filename()
+            os.replace(temp_filename, chunk)
+            self._add_chunk(chunk)
+            do_compact = 2 * self._shadowed_size > self.get_size() or len(self._chunks) > MAX_CHUNKS
+
+        if do_compact:
+            self._compact()
+
+    def compact(self):
+        """ Merges the chunks into one without the shadowed copies of files
+
+            The merged chunk is written while the archive can still be
+            read. It replaces the chunks it was made from once it is
+            complete.
+        """
+        with self._write_lock:
+            self._compact()
+
+    def _compact(self):
+        with self._lock:
+            index = dict(self._get_index())
+            merged_chunks = list(self._chunks)
+
+        temp_filename = self._temp_filename()
+        try:
+            # archived files are copied as they are (already compressed)
+            sources = dict((chunk, zipfile.ZipFile(chunk, 'r')) for chunk in merged_chunks)
+            try:
+                with zipfile.ZipFile(temp_filename, 'w', zipfile.ZIP_STORED, allowZip64=True) as archive:
+                    for name in sorted(index):
+                        chunk, info = index[name]
+                        archive.writestr(info, sources[chunk].read(info))
+            finally:
+                for source in sources.values():
+                    source.close()
+            _sync(temp_filename)
+        except BaseException:
+            os.remove(temp_filename)
+            raise
+
+        with self._lock:
+            # the merged chunk comes after the chunks it replaces so it
+            # shadows them until they are removed
+            os.replace(temp_filename, self._next_chunk_filename())
+            self.close()
+            for chunk in merged_chunks:
+                os.remove(chunk)
+
+    def close(self):
+        """ Closes the archive. It is opened again when needed. """
+        with self._lock:
+            if self._chunks is not None:
+                for archive in self._chunks.values():
+                    archive.close()
+            self._chunks = None
+            self._index = None
+            self._directories = None
+
+    def _temp_filename(self):
+        directory, basename = os.path.split(self.filename)
+        if not os.path.isdir(directory):
+            os.makedirs(directory, exist_ok=True)
+        fd, temp_filename = tempfile.mkstemp(prefix=basename + ".", suffix=".tmp", dir=directory)
+        os.close(fd)
+        return temp_filename
+
+    def _next_chunk_filename(self):
+        chunks = self._numbered_chunks()
+        number = chunks[-1][0] + 1 if len(chunks) > 0 else 1
+        return "{0:s}.{1:d}".format(self.filename, number)
+
+
+def member_name(filename):
+    """ Returns the name of the file stored as an archive entry """
+    if filename.endswith(COMPRESSED_SUFFIX):
+        return filename[:-len(COMPRESSED_SUFFIX)]
+    return filename
+
+
+def _compress_file(filename, compresslevel):
+    with open(filename, 'rb') as f:
+        return gzip.compress(f.read(), compresslevel)
+
+
+def _sync(filename):
+    """ Makes sure a file is on disk before it is moved in place """
+    with open(filename, 'rb') as f:
+        os.fsync(f.fileno())
+
+
+def _bounded_map(executor, fn, items, window, *args):
+    """ Maps a function over items keeping a limited number of results in flight (in order) """
+    futures = collections.deque()
+    for item in items:
+        futures.append(executor.submit(fn, item, *args))
+        if len(futures) >= window:
+            yield futures.popleft().result()
+
+    while futures:
+        yield futures.popleft().result()
@@ -0,0 +1,169 @@
+""" Content-addressed cache of job results shared between runs
+
+The cache is a directory where each entry is stored in a sub directory
+named from a key (usually a hash of everything that defines the job).
+An entry contains named members (files) which are copied to and from
+the working directories of the jobs.
+
+The size of the cache is bounded. When the size is exceeded the least
+recently used entries are removed. Entries are marked as used by
+updating their modification time.
+"""
+import os
+import shutil
+import tempfile
+import time
+
+
+class JobResultCache(object):
+    """ A size-bounded, least recently used cache of job results on disk """
+
+    def __init__(self, path, max_size):
+        """ Initializes the cache
+
+            :param path: the directory of the cache. It is created if it does not exist.
+            :type path: str
+            :param max_size: maximum size of the cache in bytes
+            :type max_size: int
+        """
+        self._path = os.path.abspath(path)
+        self._max_size = max_size
+        self._size = None  # lazily computed
+        if not os.path.isdir(self._path):
+            os.makedirs(self._path)
+
+    def get_path(self):
+        return self._path
+
+    def entry_path(self, key):
+        """ Returns the directory of a cache entry
+
+            :param key: the key of the entry
+            :type key: str
+            :rtype: str
+        """
+        return os.path.join(self._path, key[:2], key)
+
+    def has(self, key):
+        return os.path.isdir(self.entry_path(key))
+
+    def fetch(self, key, files):
+        """ Copies the members of a cache entry to their destinations
+
+            :param key: the key of the entry
+            :type key: str
+            :param files: destination filenames of the members of the entry
+            :type files: dict[str, str]
+            :return: whether or not all members were fetched
+            :rtype: bool
+        """
+        entry = self.entry_path(key)
+        sources = dict((member, os.path.join(entry, member)) for member in files)
+        if not all(os.path.isfile(source) for source in sources.values()):
+            return False
+
+        for member, destination in files.items():
+            directory = os.path.dirname(os.path.abspath(destination))
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+            # copy to a temporary file first so a partially copied file is never seen
+            fd, temp_filename = tempfile.mkstemp(dir=directory)
+            os.close(fd)
+            try:
+                shutil.copyfile(sources[member], temp_filename)
+                os.replace(temp_filename, destination)
+            except (IOError, OSError):
+                if os.path.exists(temp_filename):
+                    os.remove(temp_filename)
+                return False
+
+        self._touch(entry)
+        return True
+
+    def store(self, key, files):
+        """ Stores files as a new cache entry
+
+            Nothing is stored if the entry already exists or if any of the
+            files are missing.
+
+            :param key: the key of the entry
+            :type key: str
+            :param files: source filenames of the members of the entry
+            :type files: dict[str, str]
+            :return: whether or not the entry was stored
+            :rtype: bool
+        """
+        entry = self.entry_path(key)
+        if os.path.isdir(entry):
+            self._touch(entry)
+            return False
+
+        if not all(os.path.isfile(source) for source in files.values()):
+            return False
+
+        parent = os.path.dirname(entry)
+        if not os.path.isdir(parent):
+            os.makedirs(parent, exist_ok=True)
+
+        # build the entry in a temporary directory and move it in place
+        # so other processes sharing the cache never see partial entries
+        temp_entry = tempfile.mkdtemp(dir=parent)
+        size = 0
+        try:
+            for member, source in files.items():
+                shutil.copyfile(source, os.path.join(temp_entry, member))
+                size += os.path.getsize(source)
+            os.rename(temp_entry, entry)
+        except (IOError, OSError):
+            shutil.rmtree(temp_entry, ignore_errors=True)
+            return False
+
+        if self._size is not None:
+            self._size += size
+        self.evict()
+        return True
+
+    def get_size(self):
+        """ Returns the size of the cache in bytes """
+        if self._size is None:
+            self._size = sum(size for _, _, size in self._entries())
+        return self._size
+
+    def evict(self):
+        """ Removes the least recently used entries until the cache fits within its maximum size """
+        if self.get_size() <= self._max_size:
+            return
+
+        entries = sorted(self._entries())
+        size = sum(entry_size for _, _, entry_size in entries)
+        for _, entry, entry_size in entries:
+            if size <= self._max_size:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            size -= entry_size
+        self._size = size
+
+    def _entries(self):
+        """ Returns modification time, path and size of all entries in the cache """
+        entries = []
+        for prefix in os.listdir(self._path):
+            prefix_path = os.path.join(self._path, prefix)
+            if not os.path.isdir(prefix_path):
+                continue
+            for key in os.listdir(prefix_path):
+                entry = os.path.join(prefix_path, key)
+                try:
+                    mtime = os.path.getmtime(entry)
+                    size = sum(os.path.getsize(os.path.join(entry, f)) for f in os.listdir(entry))
+                except OSError:  # removed by somebody else
+                    continue
+                entries.append((mtime, entry, size))
+        return entries
+
+    @staticmethod
+    def _touch(entry):
+        now = time.time()
+        try:
+            os.utime(entry, (now, now))
+        except OSError:
+            pass
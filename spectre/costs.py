@@ -0,0 +1,210 @@
+""" Cost model of DALTON jobs used to order and pack them
+
+The cost of a job is estimated in core-seconds as
+
+    t = c * N^p
+
+where N is the (estimated) number of basis functions of the molecule
+and c and p depend on the type of job. Initial values of c and p are
+rough defaults. Measured timings of finished jobs are recorded in a
+telemetry file and, as they accumulate, c and p are fitted to them.
+"""
+import heapq
+import json
+import os
+import tempfile
+import threading
+
+import numpy
+
+# number of basis functions for elements in rows 1, 2, 3 and beyond of
+# the periodic table (cartesian d-functions as used by Pople basis sets)
+BASIS_FUNCTIONS = {
+    "sto-3g": (1, 5, 9, 18),
+    "6-31g": (2, 9, 13, 22),
+    "6-31g*": (2, 15, 19, 28),
+    "6-31g**": (5, 15, 19, 28),
+    "6-31+g*": (2, 19, 23, 32),
+    "6-31+g**": (5, 19, 23, 32),
+    "6-31++g**": (6, 19, 23, 32),
+    "cc-pvdz": (5, 14, 18, 27),
+    "aug-cc-pvdz": (9, 23, 27, 36),
+    "cc-pvtz": (14, 30, 34, 43),
+    "aug-cc-pvtz": (23, 46, 50, 59),
+}
+DEFAULT_BASIS = "6-31+g*"
+
+DEFAULT_EXPONENT = 3.0
+DEFAULT_SCALE = 1.0e-5
+DEFAULT_SCALES = {"loprop": 2.0e-5,
+                  "pde_monomer": 1.0e-5,
+                  "pde_dimer": 3.0e-5,
+                  "peex": 1.0e-4,
+                  "pdeex": 1.5e-4}
+
+
+def element_row(nuclear_charge):
+    """ Returns the row (1, 2, 3 or 4 for anything beyond) of an element in the periodic table """
+    if nuclear_charge <= 2:
+        return 1
+    if nuclear_charge <= 10:
+        return 2
+    if nuclear_charge <= 18:
+        return 3
+    return 4
+
+
+def estimate_basis_functions(molecule, basis):
+    """ Estimates the number of basis functions of a molecule
+
+        Unknown basis sets are estimated as 6-31+G*. A "loprop-" prefix
+        (used for LoProp calculations) is ignored.
+
+        :param molecule: the molecule
+        :type molecule: Molecule
+        :param basis: the name of the basis set
+        :type basis: str
+        :rtype: int
+    """
+    name = basis.lower()
+    if name.startswith("loprop-"):
+        name = name[len("loprop-"):]
+    counts = BASIS_FUNCTIONS.get(name, BASIS_FUNCTIONS[DEFAULT_BASIS])
+    return sum(counts[element_row(atom.get_nuclear_charge()) - 1] for atom in molecule.get_atoms())
+
+
+class CostModel(object):
+    """ Estimates the cost of jobs from telemetry of previous jobs """
+
+    def __init__(self, filename=None, max_records=200):
+        """ Initializes the cost model
+
+            :param filename: the telemetry file. If None, timings are not stored between runs.
+            :type filename: str
+            :param max_records: the number of (most recent) timings to keep for each type of job
+            :type max_records: int
+        """
+        self._filename = filename
+        self._max_records = max_records
+        self._records = self._read()
+        self._new_records = {}
+        self._lock = threading.Lock()  # batches of jobs may finish at the same time
+
+    def estimate(self, job_type, num_basis_functions):
+        """ Estimates the cost of a job
+
+            :param job_type: the type of job
+            :type job_type: str
+            :param num_basis_functions: the number of basis functions
+            :type num_basis_functions: int
+            :return: the estimated cost in core-seconds
+            :rtype: float
+        """
+        scale, exponent = self.get_parameters(job_type)
+        return scale * max(1, num_basis_functions)**exponent
+
+    def get_parameters(self, job_type):
+        """ Returns the scale and exponent of the cost of a type of job
+
+            The exponent is fitted once timings for jobs of (sufficiently)
+            different sizes exist. Otherwise only the scale is fitted.
+
+            :param job_type: the type of job
+            :type job_type: str
+            :rtype: tuple[float, float]
+        """
+        records = numpy.array(self._records.get(job_type, []), dtype=float).reshape(-1, 2)
+        records = records[(records[:, 0] > 0) & (records[:, 1] > 0)]
+        if len(records) == 0:
+            return DEFAULT_SCALES.get(job_type, DEFAULT_SCALE), DEFAULT_EXPONENT
+
+        log_n = numpy.log(records[:, 0])
+        log_t = numpy.log(records[:, 1])
+        exponent = DEFAULT_EXPONENT
+        if len(records) >= 3 and numpy.max(records[:, 0]) >= 1.5 * numpy.min(records[:, 0]):
+            exponent, _ = numpy.polyfit(log_n, log_t, 1)
+            exponent = min(max(exponent, 1.0), 4.0)
+
+        scale = numpy.exp(numpy.median(log_t - exponent * log_n))
+        return float(scale), float(exponent)
+
+    def record(self, job_type, num_basis_functions, cost):
+        """ Records the measured cost of a job
+
+            :param job_type: the type of job
+            :type job_type: str
+            :param num_basis_functions: the number of basis functions
+            :type num_basis_functions: int
+            :param cost: the measured cost in core-seconds
+            :type cost: float
+        """
+        record = [int(num_basis_functions), float(cost)]
+        with self._lock:
+            self._records.setdefault(job_type, []).append(record)
+            self._new_records.setdefault(job_type, []).append(record)
+
+    def save(self):
+        """ Adds the recorded timings to the telemetry file
+
+            The file is read again before writing so timings recorded by
+            other runs in the meantime are kept.
+        """
+        with self._lock:
+            self._save()
+
+    def _save(self):
+        if self._filename is None or len(self._new_records) == 0:
+            return
+
+        records = self._read()
+        for job_type, new_records in self._new_records.items():
+            records[job_type] = (records.get(job_type, []) + new_records)[-self._max_records:]
+
+        directory = os.path.dirname(os.path.abspath(self._filename))
+        if not os.path.isdir(directory):
+            os.makedirs(directory, exist_ok=True)
+        fd, temp_filename = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(records, f)
+        os.replace(temp_filename, self._filename)
+
+        self._records = records
+        self._new_records = {}
+
+    def _read(self):
+        if self._filename is None or not os.path.exists(self._filename):
+            return {}
+
+        try:
+            with open(self._filename, 'r') as f:
+                records = json.load(f)
+        except (IOError, ValueError):  # a broken telemetry file should never stop a calculation
+            return {}
+
+        if not isinstance(records, dict):
+            return {}
+        return records
+
+
+def longest_processing_time(costs, num_slots):
+    """ Orders and packs jobs with the longest processing time first rule
+
+        Jobs are ordered by decreasing cost and each job is assigned to
+        the slot (a job on a node) that becomes free first.
+
+        :param costs: the cost of each job
+        :type costs: list[float]
+        :param num_slots: the number of jobs that can run at the same time
+        :type num_slots: int
+        :return: the order of the jobs, the slot of each job and the estimated makespan
+        :rtype: tuple[list[int], list[int], float]
+    """
+    order = sorted(range(len(costs)), key=lambda i: -costs[i])
+    slots = [(0.0, slot) for slot in range(max(1, num_slots))]
+    assignment = [0] * len(costs)
+    for i in order:
+        load, slot = heapq.heappop(slots)
+        assignment[i] = slot
+        heapq.heappush(slots, (load + costs[i], slot))
+
+    return order, assignment, max(load for load, _ in slots)
@@ -0,0 +1,504 @@
+""" Backends that execute the DALTON jobs of SPECTRE
+
+An executor runs a list of jobs with a number of jobs per node and
+cores per job. Two backends exist:
+
+  - CalcItExecutor, which starts workers on all nodes of the allocation
+    through a remote shell and hands them the jobs through a socket, and
+  - LocalExecutor, which runs the jobs on the current node with a pool of
+    subprocesses pinned to their own cores.
+
+The local executor renders the run script of a job itself. A job must
+provide
+
+  - get_jobname() -- the name of the job,
+  - job_directory -- the directory the job runs in,
+  - run_script_filename -- the run script template,
+  - ncpus -- the number of cores of the job,
+  - scratch_base -- base directory for scratch files, and
+  - get_run_script_substitutions() -- program specific substitutions.
+
+Small jobs can be packed into a JobBundle which runs as a single task.
+The rendered run scripts of the members are inlined in the script of the
+bundle, so the members run one after the other in (a subshell of) the
+same shell. The exit code of each member is written to a status file
+next to its log. The CalcIt executor runs a bundle as a single CalcIt
+job created by the bundle_job callable it is given.
+"""
+import concurrent.futures
+import os
+import shlex
+import string
+import subprocess
+import threading
+
+# files of a job (its name followed by the suffix) written by the run scripts
+RESULT_SUFFIXES = (".out", ".dalout", ".loprop", ".h5")
+
+
+class CalcItExecutor(object):
+    """ Executes jobs with CalcIt on the nodes of the allocation
+
+        Lists of jobs processed at the same time (from different threads)
+        run on disjoint sets of nodes, each with its own CalcIt server.
+    """
+
+    def __init__(self, nodes, port=2048, remote_shell='ssh', bundle_job=None):
+        """ Initializes the executor
+
+            :param nodes: the nodes to run on
+            :type nodes: list[str]
+            :param port: the port of the CalcIt server
+            :type port: int
+            :param remote_shell: the program used to start workers on the nodes
+            :type remote_shell: str
+            :param bundle_job: callable creating the CalcIt job that runs the script of a bundle. If None, jobs are not bundled.
+        """
+        self.nodes = nodes
+        self.port = port
+        self.remote_shell = remote_shell
+        self.bundle_job = bundle_job
+        self._free_nodes = list(nodes)
+        self._nodes_released = threading.Condition()
+
+    @property
+    def supports_bundles(self):
+        return self.bundle_job is not None
+
+    @property
+    def max_concurrent_batches(self):
+        """ The number of lists of jobs that can be processed at the same time (one per node) """
+        return len(self.nodes)
+
+    def acquire_nodes(self, num_nodes):
+        """ Waits until a node is free and takes up to num_nodes free nodes
+
+            :param num_nodes: the number of nodes wanted
+            :type num_nodes: int
+            :rtype: list[str]
+        """
+        with self._nodes_released:
+            while len(self._free_nodes) == 0:
+                self._nodes_released.wait()
+            nodes = self._free_nodes[:max(1, num_nodes)]
+            del self._free_nodes[:len(nodes)]
+            return nodes
+
+    def release_nodes(self, nodes):
+        """ Returns nodes taken with :meth:`acquire_nodes` """
+        with self._nodes_released:
+            self._free_nodes.extend(nodes)
+            self._nodes_released.notify_all()
+
+    def get_num_slots(self, jobs_per_node, cpus_per_job):
+        return len(self.nodes) * jobs_per_node
+
+    def get_calcit_jobs(self, jobs):
+        """ Returns the CalcIt jobs to process
+
+            The scripts of bundles are written and each bundle is replaced
+            by the CalcIt job running it. The members take their memory from
+            the MEMORY variable set by that job.
+
+            :param jobs: the jobs and bundles
+            :type jobs: list
+            :rtype: list
+        """
+        calcit_jobs = []
+        for job in jobs:
+            if isinstance(job, JobBundle):
+                write_bundle_script(job)
+                job = self.bundle_job(job)
+            calcit_jobs.append(job)
+        return calcit_jobs
+
+    def process(self, jobs, jobs_per_node, cpus_per_job, work_dir, do_execute):
+        """ Processes jobs with CalcIt
+
+            :param jobs: the jobs to process
+            :type jobs: list
+            :param jobs_per_node: number of jobs to execute per node
+            :type jobs_per_node: int
+            :param cpus_per_job: number of cores per job (set on the jobs themselves)
+            :type cpus_per_job: int
+            :param work_dir: the base working directory of the jobs
+            :type work_dir: str
+            :param do_execute: whether or not the jobs should execute
+            :type do_execute: bool
+        """
+        import calcit
+        import calcit.util
+
+        jobs = self.get_calcit_jobs(jobs)
+        authorization_key = calcit.util.generate_auth_key("auto")
+        calcit_paths = calcit.util.directories(os.environ['CALCIT'] + '/bin/calcit')
+        nodes = self.acquire_nodes(-(-len(jobs) // jobs_per_node))
+        try:
+            # the first node is only used by this list of jobs, so is the port derived from it
+            port = self.port + self.nodes.index(nodes[0])
+            calcit.process_jobs(port, authorization_key,
+                                jobs, nodes, jobs_per_node,
+                                work_dir, self.remote_shell,
+                                calcit_paths, do_execute)
+        finally:
+            self.release_nodes(nodes)
+
+
+class LocalExecutor(object):
+    """ Executes jobs on the current node with a pool of subprocesses
+
+        Each running job is pinned to its own group of cores_per_job
+        cores. The cores are shared by all lists of jobs processed at the
+        same time (from different threads) so a job only starts once
+        enough cores are free.
+    """
+
+    supports_bundles = True
+
+    def __init__(self, cpus=None, memory_per_cpu=1000, pin=True, shell='bash'):
+        """ Initializes the executor
+
+            :param cpus: the cores to run on. Default is all cores available to the process.
+            :type cpus: list[int]
+            :param memory_per_cpu: memory (in MB) given to a job per core
+            :type memory_per_cpu: int
+            :param pin: whether or not to pin the jobs to their cores
+            :type pin: bool
+            :param shell: the shell used to run the scripts
+            :type shell: str
+        """
+        if cpus is None:
+            cpus = sorted(available_cpus())
+        self.cpus = list(cpus)
+        self.memory_per_cpu = memory_per_cpu
+        self.pin = pin and hasattr(os, 'sched_setaffinity')
+        self.shell = shell
+        self._free_cpus = set(self.cpus)
+        self._cpus_released = threading.Condition()
+
+    @property
+    def max_concurrent_batches(self):
+        """ The number of lists of jobs that can be processed at the same time (one per core) """
+        return len(self.cpus)
+
+    def get_cpu_groups(self, jobs_per_node, cpus_per_job):
+        """ Splits the cores into (at most jobs_per_node) groups of cpus_per_job cores
+
+            :rtype: list[list[int]]
+        """
+        cpus_per_job = max(1, cpus_per_job)
+        groups = [self.cpus[i:i+cpus_per_job] for i in range(0, len(self.cpus), cpus_per_job)]
+        groups = [group for group in groups if len(group) == cpus_per_job]
+        if len(groups) == 0:  # fewer cores than requested by a single job
+            groups = [list(self.cpus)]
+        return groups[:max(1, jobs_per_node)]
+
+    def get_num_slots(self, jobs_per_node, cpus_per_job):
+        return len(self.get_cpu_groups(jobs_per_node, cpus_per_job))
+
+    def acquire_cpus(self, num_cpus):
+        """ Waits until a number of cores are free and takes them
+
+            :param num_cpus: the number of cores
+            :type num_cpus: int
+            :rtype: list[int]
+        """
+        with self._cpus_released:
+            while len(self._free_cpus) < num_cpus:
+                self._cpus_released.wait()
+            cpus = sorted(self._free_cpus)[:num_cpus]
+            self._free_cpus.difference_update(cpus)
+            return cpus
+
+    def release_cpus(self, cpus):
+        """ Returns cores taken with :meth:`acquire_cpus` """
+        with self._cpus_released:
+            self._free_cpus.update(cpus)
+            self._cpus_released.notify_all()
+
+    def render_run_script(self, job):
+        """ Renders the run script of a job
+
+            :param job: the job
+            :return: the contents of the run script
+            :rtype: str
+        """
+        return render_run_script(job, "{0:d}".format(self.memory_per_cpu * job.ncpus))
+
+    def write_run_script(self, job):
+        """ Writes the rendered run script to the directory of the job
+
+            :return: the filename of the script
+            :rtype: str
+        """
+        if isinstance(job, JobBundle):
+            return write_bundle_script(job, self.memory_per_cpu)
+
+        content = self.render_run_script(job)
+        filename = run_script_filename(job)
+        with open(filename, 'w') as script_file:
+            script_file.write(content)
+        return filename
+
+    def process(self, jobs, jobs_per_node, cpus_per_job, work_dir, do_execute):
+        """ Processes jobs on the current node
+
+            Jobs are started in order whenever a group of cores is free.
+            At most jobs_per_node jobs of the list run at the same time.
+
+            :param jobs: the jobs to process
+            :type jobs: list
+            :param jobs_per_node: maximum number of jobs to execute at the same time
+            :type jobs_per_node: int
+            :param cpus_per_job: number of cores per job
+            :type cpus_per_job: int
+            :param work_dir: the base working directory of the jobs (unused, jobs know their directory)
+            :type work_dir: str
+            :param do_execute: whether or not the jobs should execute. If not, only the scripts are written.
+            :type do_execute: bool
+            :return: the exit code of each job (None for jobs not executed)
+            :rtype: list[int]
+        """
+        scripts = [self.write_run_script(job) for job in jobs]
+        if not do_execute:
+            return [None] * len(jobs)
+
+        groups = self.get_cpu_groups(jobs_per_node, cpus_per_job)
+
+        def run(job, script):
+            cpus = self.acquire_cpus(len(groups[0]))
+            try:
+                return self._run_script(job, script, cpus)
+            finally:
+                self.release_cpus(cpus)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(groups)) as executor:
+            futures = [executor.submit(run, job, script) for job, script in zip(jobs, scripts)]
+            return [future.result() for future in futures]
+
+    def _run_script(self, job, script, cpus):
+        scratch = os.path.join(job.scratch_base, job.get_jobname())
+        if not isinstance(job, JobBundle) and not os.path.isdir(scratch):
+            os.makedirs(scratch, exist_ok=True)
+
+        log_filename = script + ".log"
+        with open(log_filename, 'w') as log_file:
+            process = subprocess.Popen([self.shell, script], cwd=job.job_directory,
+                                       stdout=log_file, stderr=subprocess.STDOUT)
+            if self.pin:
+                try:
+                    os.sched_setaffinity(process.pid, cpus)
+                except OSError:  # the process already finished
+                    pass
+            returncode = process.wait()
+
+        if not isinstance(job, JobBundle):
+            with open(status_filename(job), 'w') as status_file:
+                status_file.write("{0:d}\n".format(returncode))
+
+        if returncode != 0:
+            print("Warning: job '{0:s}' exited with code {1:d}. See {2:s}".format(job.get_jobname(), returncode, log_filename))
+        return returncode
+
+
+def available_cpus():
+    """ Returns the cores available to the current process
+
+        :rtype: set[int]
+    """
+    if hasattr(os, 'sched_getaffinity'):
+        return os.sched_getaffinity(0)
+    return set(range(os.cpu_count() or 1))
+
+
+class JobBundle(object):
+    """ A group of small jobs executed one after the other as a single task """
+
+    def __init__(self, name, members, directory):
+        """ Initializes a bundle
+
+            :param name: the name of the bundle
+            :type name: str
+            :param members: the jobs in the bundle
+            :type members: list
+            :param directory: the directory of the bundle script
+            :type directory: str
+        """
+        self.name = name
+        self.members = list(members)
+        self.job_directory = directory
+        self.ncpus = max(job.ncpus for job in self.members)
+        self.scratch_base = self.members[0].scratch_base
+
+    def get_jobname(self):
+        return self.name
+
+    def __str__(self):
+        return "Bundle ({0:s}, {1:d} jobs)".format(self.name, len(self.members))
+
+
+def render_run_script(job, memory):
+    """ Renders the run script of a job
+
+        :param job: the job
+        :param memory: the memory (in MB) of the job. Can also be a shell variable such as $MEMORY.
+        :type memory: str
+        :return: the contents of the run script
+        :rtype: str
+    """
+    job_name = job.get_jobname()
+    substitutions = {'WORK_DIR': job.job_directory,
+                     'SCRATCH': os.path.join(job.scratch_base, job_name),
+                     'JOB': job_name,
+                     'NCPUS': "{0:d}".format(job.ncpus),
+                     'MEMORY': memory}
+    substitutions.update(job.get_run_script_substitutions())
+    substitutions = dict((key, "" if value is None else value) for key, value in substitutions.items())
+
+    with open(job.run_script_filename, 'r') as script_file:
+        template = string.Template(script_file.read())
+    return template.safe_substitute(substitutions)
+
+
+def render_bundle_script(bundle, memory_per_cpu=None):
+    """ Renders the script of a bundle which runs its members one after the other
+
+        The rendered run script of each member is inlined in a subshell
+        so all members run in the same shell without starting a new one.
+
+        :param bundle: the bundle
+        :type bundle: JobBundle
+        :param memory_per_cpu: memory (in MB) given to a member per core. If None, the members use the MEMORY variable.
+        :type memory_per_cpu: int
+        :return: the contents of the bundle script
+        :rtype: str
+    """
+    lines = ["#!/usr/bin/env bash", "# bundle of {0:d} jobs".format(len(bundle.members))]
+    for job in bundle.members:
+        memory = "$MEMORY"
+        if memory_per_cpu is not None:
+            memory = "{0:d}".format(memory_per_cpu * job.ncpus)
+        scratch = os.path.join(job.scratch_base, job.get_jobname())
+        lines.append("mkdir -p {0:s}".format(shlex.quote(scratch)))
+        lines.append("(")
+        lines.append("cd {0:s} || exit 1".format(shlex.quote(job.job_directory)))
+        lines.append(render_run_script(job, memory).rstrip("\n"))
+        lines.append(") > {0:s} 2>&1".format(shlex.quote(run_script_filename(job) + ".log")))
+        lines.append("echo $? > {0:s}".format(shlex.quote(status_filename(job))))
+    return "\n".join(lines) + "\n"
+
+
+def write_bundle_script(bundle, memory_per_cpu=None):
+    """ Writes the rendered script of a bundle to its directory
+
+        See :func:`render_bundle_script`.
+
+        :return: the filename of the script
+        :rtype: str
+    """
+    filename = bundle_script_filename(bundle)
+    with open(filename, 'w') as script_file:
+        script_file.write(render_bundle_script(bundle, memory_per_cpu))
+    return filename
+
+
+def run_script_filename(job):
+    """ Returns the filename of the rendered run script of a job """
+    return os.path.join(job.job_directory, "{0:s}.sh".format(job.get_jobname()))
+
+
+def bundle_script_filename(bundle):
+    """ Returns the filename of the rendered script of a bundle """
+    return os.path.join(bundle.job_directory, "{0:s}.bundle".format(bundle.get_jobname()))
+
+
+def status_filename(job):
+    """ Returns the filename where the exit code of a job is written """
+    return os.path.join(job.job_directory, "{0:s}.status".format(job.get_jobname()))
+
+
+def remove_job_results(job):
+    """ Removes the results of a job so it runs again
+
+        The run scripts skip the work of a job whose DALTON log file (or
+        LoProp output) exists, so the results of a failed job must be
+        removed before it is retried. The exit status of the job is
+        removed as well. The inputs of the job are kept.
+
+        :param job: the job
+        :return: the removed files
+        :rtype: list[str]
+    """
+    prefix = os.path.join(job.job_directory, job.get_jobname())
+    filenames = [prefix + suffix for suffix in RESULT_SUFFIXES] + [status_filename(job)]
+    removed = []
+    for filename in filenames:
+        if os.path.exists(filename):
+            os.remove(filename)
+            removed.append(filename)
+    return removed
+
+
+def read_job_status(job):
+    """ Returns the exit code of a job run by the local executor
+
+        :return: the exit code or None if the job did not run (to the end)
+        :rtype: int
+    """
+    try:
+        with open(status_filename(job), 'r') as status_file:
+            return int(status_file.read().strip())
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def make_bundles(jobs, costs, target_duration, num_slots, directory):
+    """ Packs small jobs into bundles
+
+        Jobs that take longer than the target duration are not bundled.
+        The remaining jobs are packed (in order) into bundles that take
+        about the target duration. The target is lowered if needed so
+        there are at least as many bundles as slots to run them in.
+
+        :param jobs: the jobs
+        :type jobs: list
+        :param costs: the estimated duration of each job
+        :type costs: list[float]
+        :param target_duration: the duration of a bundle
+        :type target_duration: float
+        :param num_slots: the number of jobs that run at the same time
+        :type num_slots: int
+        :param directory: the directory of the bundle scripts. It is created if needed.
+        :type directory: str
+        :return: the jobs that are not bundled followed by the bundles
+        :rtype: list
+    """
+    small_jobs = [(job, cost) for job, cost in zip(jobs, costs) if cost < target_duration]
+    units = [job for job, cost in zip(jobs, costs) if cost >= target_duration]
+    if len(small_jobs) == 0:
+        return units
+
+    total = sum(cost for _, cost in small_jobs)
+    if total <= 0.0:  # nothing is known about the jobs so they are assumed to be equal
+        small_jobs = [(job, 1.0) for job, _ in small_jobs]
+        total = float(len(small_jobs))
+    target = min(target_duration, total / max(1, num_slots))
+
+    groups = [[]]
+    duration = 0.0
+    for job, cost in small_jobs:
+        if len(groups[-1]) > 0 and duration + cost > target:
+            groups.append([])
+            duration = 0.0
+        groups[-1].append(job)
+        duration += cost
+
+    if not os.path.isdir(directory):
+        os.makedirs(directory, exist_ok=True)
+
+    for i, group in enumerate(groups, start=1):
+        if len(group) == 1:
+            units.append(group[0])
+        else:
+            units.append(JobBundle("bundle_{0:05d}".format(i), group, directory))
+    return units
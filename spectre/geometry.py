@@ -0,0 +1,131 @@
+""" Geometric utilities for selecting molecules in a system
+
+"""
+import numpy
+
+
+def minimum_distance(coordinates_a, coordinates_b):
+    """ Computes the shortest distance between two sets of coordinates
+
+        :param coordinates_a: the first set of coordinates
+        :type coordinates_a: numpy.ndarray
+        :param coordinates_b: the second set of coordinates
+        :type coordinates_b: numpy.ndarray
+        :return: the shortest distance between any point in a and any point in b
+        :rtype: float
+    """
+    dr = coordinates_a[:, numpy.newaxis, :] - coordinates_b[numpy.newaxis, :, :]
+    return numpy.sqrt(numpy.min(numpy.einsum('ijk,ijk->ij', dr, dr)))
+
+
+def molecules_within_distance(molecules, index, distance):
+    """ Finds all molecules within a distance of a molecule
+
+        The distance between two molecules is taken as the shortest
+        distance between any pair of atoms in the two molecules.
+
+        :param molecules: all molecules in the system
+        :type molecules: list[Molecule]
+        :param index: the index of the molecule to search around
+        :type index: int
+        :param distance: the distance in Angstrom. A negative value selects all molecules.
+        :type distance: float
+        :return: indices of the molecules within the distance (excluding the molecule itself)
+        :rtype: list[int]
+    """
+    if distance < 0.0:
+        return [j for j in range(len(molecules)) if j != index]
+
+    coordinates = molecules[index].get_coordinates()
+    indices = []
+    for j, molecule in enumerate(molecules):
+        if j == index:
+            continue
+
+        if minimum_distance(coordinates, molecule.get_coordinates()) <= distance:
+            indices.append(j)
+
+    return indices
+
+
+def molecules_near(molecules, indices, distance):
+    """ Finds all molecules within a distance of any of a set of molecules
+
+        The distance is measured as in :func:`molecules_within_distance`.
+
+        :param molecules: all molecules in the system
+        :type molecules: list[Molecule]
+        :param indices: the indices of the molecules to search around
+        :type indices: list[int]
+        :param distance: the distance in Angstrom. A negative value selects all molecules.
+        :type distance: float
+        :return: sorted indices of the molecules within the distance (including the molecules searched around)
+        :rtype: list[int]
+    """
+    if distance < 0.0:
+        return list(range(len(molecules)))
+    if len(indices) == 0:
+        return []
+
+    # all molecules are compared to the atoms of all centers at once
+    centers = set(indices)
+    coordinates = numpy.vstack([molecules[i].get_coordinates() for i in sorted(centers)])
+    return [j for j, molecule in enumerate(molecules)
+            if j in centers or minimum_distance(coordinates, molecule.get_coordinates()) <= distance]
+
+
+def kabsch_rotation(reference, target):
+    """ Computes the rotation that best aligns two sets of coordinates
+
+        Both sets of coordinates are centered before the rotation is found
+        with the Kabsch algorithm. The rotation R minimizes the distance
+        between R.(reference - c_ref) and (target - c_target).
+
+        :param reference: the coordinates to rotate
+        :type reference: numpy.ndarray
+        :param target: the coordinates to rotate onto
+        :type target: numpy.ndarray
+        :return: the 3x3 rotation matrix and the root mean square deviation after alignment
+        :rtype: tuple[numpy.ndarray, float]
+    """
+    p = reference - numpy.mean(reference, axis=0)
+    q = target - numpy.mean(target, axis=0)
+    u, _, vt = numpy.linalg.svd(p.T.dot(q))
+    d = numpy.sign(numpy.linalg.det(vt.T.dot(u.T)))
+    rotation = vt.T.dot(numpy.diag([1.0, 1.0, d])).dot(u.T)
+    dr = p.dot(rotation.T) - q
+    rmsd = numpy.sqrt(numpy.sum(dr * dr) / len(reference))
+    return rotation, rmsd
+
+
+def rigid_body_clusters(molecules, tolerance):
+    """ Clusters molecules that are (nearly) rigid-body copies of each other
+
+        Molecules belong to the same species if they have the same name and
+        the same sequence of nuclear charges. Within a species, a molecule is
+        assigned to the first representative it can be aligned to with a
+        root mean square deviation below the tolerance. Otherwise it becomes
+        a new representative.
+
+        :param molecules: the molecules to cluster
+        :type molecules: list[Molecule]
+        :param tolerance: the largest root mean square deviation (in Angstrom) after alignment
+        :type tolerance: float
+        :return: the index of the representative for each molecule
+        :rtype: list[int]
+    """
+    representatives = {}  # species -> indices of representatives
+    clusters = []
+    for i, molecule in enumerate(molecules):
+        species = (molecule.get_name(), tuple(molecule.get_nuclear_charges().tolist()))
+        coordinates = molecule.get_coordinates()
+        for j in representatives.setdefault(species, []):
+            _, rmsd = kabsch_rotation(molecules[j].get_coordinates(), coordinates)
+            if rmsd <= tolerance:
+                clusters.append(j)
+                break
+        else:
+            representatives[species].append(i)
+            clusters.append(i)
+
+    return clusters
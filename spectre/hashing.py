@@ -0,0 +1,60 @@
+""" Content hashes used to identify calculations
+
+"""
+import hashlib
+
+import numpy
+
+
+def canonical_geometry(molecule, decimals=6):
+    """ Returns a canonical string representation of a molecule
+
+        The representation contains the charge of the molecule and the
+        nuclear charges and coordinates (in Angstrom) of all atoms rounded
+        to a fixed number of decimals.
+
+        :param molecule: the molecule
+        :type molecule: Molecule
+        :param decimals: number of decimals to round the coordinates to
+        :type decimals: int
+        :rtype: str
+    """
+    coordinates = numpy.round(molecule.get_coordinates(), decimals) + 0.0  # adding 0.0 removes negative zeros
+    fmt = "{0:d} {1[0]:.{2:d}f} {1[1]:.{2:d}f} {1[2]:.{2:d}f}"
+    lines = ["{0:d}".format(molecule.get_charge())]
+    for nuclear_charge, coordinate in zip(molecule.get_nuclear_charges(), coordinates):
+        lines.append(fmt.format(int(nuclear_charge), coordinate, decimals))
+    return "\n".join(lines)
+
+
+def molecule_digest(molecule, *settings):
+    """ Computes a hash of a molecule and the settings used to compute it
+
+        :param molecule: the molecule
+        :type molecule: Molecule
+        :param settings: additional settings (basis set, functional and so on) that identify the calculation
+        :return: hexadecimal sha256 digest
+        :rtype: str
+    """
+    sha = hashlib.sha256()
+    sha.update(canonical_geometry(molecule).encode('utf-8'))
+    for setting in settings:
+        sha.update(b"\0")
+        sha.update(str(setting).encode('utf-8'))
+    return sha.hexdigest()
+
+
+def file_digest(filename):
+    """ Computes a hash of the contents of a file
+
+        :param filename: the file to hash. If None, the hash of an empty file is returned.
+        :type filename: str
+        :return: hexadecimal sha256 digest
+        :rtype: str
+    """
+    sha = hashlib.sha256()
+    if filename is not None:
+        with open(filename, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                sha.update(chunk)
+    return sha.hexdigest()
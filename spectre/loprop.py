@@ -0,0 +1,187 @@
+""" Reading, writing and manipulating LoProp data files
+
+A LoProp data file (.loprop) is in atomic units and has the format
+
+    AU
+    nat lmax amax 1
+    1  x  y  z  q [dx dy dz] [qxx qxy qxz qyy qyz qzz] [a | axx axy axz ayy ayz azz]
+    ...
+
+where each atom has a line with coordinates, multipoles up to order
+lmax and (if amax > 0) either an isotropic (amax = 1) or an anisotropic
+(amax = 2) polarizability. Symmetric tensors are stored in the order
+xx, xy, xz, yy, yz, zz.
+"""
+import hashlib
+import io
+
+import numpy
+
+from spectre.errors import SpectrePotentialValueError
+
+MULTIPOLE_SIZE = {0: 1, 1: 3, 2: 6}
+POLARIZABILITY_SIZE = {1: 1, 2: 6}
+
+
+class LoPropData(object):
+    """ Representation of the atomic parameters in a LoProp data file """
+
+    def __init__(self, coordinates, multipoles, polarizabilities=None):
+        """ Initializes LoProp data
+
+            :param coordinates: atomic coordinates in atomic units
+            :type coordinates: numpy.ndarray
+            :param multipoles: multipoles of each order
+            :type multipoles: dict[int, list[list[float]]]
+            :param polarizabilities: isotropic (one value) or anisotropic (six values) polarizability for each atom
+            :type polarizabilities: list[list[float]]
+        """
+        self.coordinates = numpy.array(coordinates, dtype=float)
+        self.multipoles = multipoles
+        self.polarizabilities = polarizabilities
+        if polarizabilities is None:
+            self.polarizabilities = []
+
+    def get_num_atoms(self):
+        return len(self.coordinates)
+
+    def get_multipole_order(self):
+        return max(self.multipoles.keys())
+
+    def get_polarizability_order(self):
+        if len(self.polarizabilities) == 0:
+            return 0
+        if len(self.polarizabilities[0]) == 1:
+            return 1
+        return 2
+
+
+def read_loprop_data(loprop_file):
+    """ Reads LoProp data from an open file
+
+        :param loprop_file: the file to read from
+        :type loprop_file: io.TextIOBase
+        :raises SpectrePotentialValueError: the data is not understood
+        :rtype: LoPropData
+    """
+    line = loprop_file.readline()  # AA or AU
+    if "AA" in line:
+        raise SpectrePotentialValueError("Expected units to be in AU.")
+
+    nat, lmax, amax, dum = list(map(int, loprop_file.readline().split()))
+    if nat == 0:
+        raise SpectrePotentialValueError("No atoms found.")
+    if lmax > 2:
+        raise SpectrePotentialValueError("Only supports up to quadrupoles.")
+    if amax > 2:
+        raise SpectrePotentialValueError("Does not support polarizability tensors with dim > 2.")
+
+    coordinates = []
+    mul_data = {}
+    pol_data = []
+    for i in range(nat):
+        tokens = list(map(float, loprop_file.readline().split()))
+        coordinates.append(tokens[1:4])
+        tokens = tokens[4:]
+        for l in range(lmax+1):
+            if l not in mul_data:
+                mul_data[l] = []
+
+            offset = MULTIPOLE_SIZE[l]
+            mul_data[l].append(tokens[0:offset])
+            tokens = tokens[offset:]
+
+        if amax == 0:
+            continue
+
+        if len(tokens) == POLARIZABILITY_SIZE[amax]:
+            pol_data.append(tokens)
+        else:
+            raise SpectrePotentialValueError("Wrong number of polarizability components for atom {0:d}.".format(i+1))
+
+    return LoPropData(coordinates, mul_data, pol_data)
+
+
+def write_loprop_data(loprop_file, data):
+    """ Writes LoProp data to an open file
+
+        :param loprop_file: the file to write to
+        :type loprop_file: io.TextIOBase
+        :param data: the data to write
+        :type data: LoPropData
+    """
+    lmax = data.get_multipole_order()
+    amax = data.get_polarizability_order()
+    lines = ["AU", "{0:d} {1:d} {2:d} 1".format(data.get_num_atoms(), lmax, amax)]
+    for i, coordinate in enumerate(data.coordinates):
+        values = list(coordinate)
+        for l in range(lmax+1):
+            values.extend(data.multipoles[l][i])
+        if amax > 0:
+            values.extend(data.polarizabilities[i])
+        lines.append("1 " + "".join("{0:16.9f}".format(value) for value in values))
+    loprop_file.write("\n".join(lines) + "\n")
+
+
+def loprop_data_digest(data):
+    """ Computes a hash of LoProp data as it is written to a file (see :func:`write_loprop_data`)
+
+        :param data: the data
+        :type data: LoPropData
+        :return: hexadecimal sha256 digest
+        :rtype: str
+    """
+    buffer = io.StringIO()
+    write_loprop_data(buffer, data)
+    return hashlib.sha256(buffer.getvalue().encode('utf-8')).hexdigest()
+
+
+def unpack_symmetric(values):
+    """ Unpacks a symmetric tensor stored as xx, xy, xz, yy, yz, zz
+
+        :rtype: numpy.ndarray
+    """
+    xx, xy, xz, yy, yz, zz = values
+    return numpy.array([[xx, xy, xz],
+                        [xy, yy, yz],
+                        [xz, yz, zz]])
+
+
+def pack_symmetric(tensor):
+    """ Packs a symmetric tensor to xx, xy, xz, yy, yz, zz
+
+        :rtype: list[float]
+    """
+    return [tensor[0, 0], tensor[0, 1], tensor[0, 2], tensor[1, 1], tensor[1, 2], tensor[2, 2]]
+
+
+def rotate_loprop_data(data, rotation, coordinates):
+    """ Rotates LoProp data onto new coordinates
+
+        Dipoles are rotated as vectors while quadrupoles and anisotropic
+        polarizabilities are rotated as second-rank tensors. Charges and
+        isotropic polarizabilities are invariant.
+
+        :param data: the data to rotate
+        :type data: LoPropData
+        :param rotation: the 3x3 rotation matrix
+        :type rotation: numpy.ndarray
+        :param coordinates: the new atomic coordinates in atomic units
+        :type coordinates: numpy.ndarray
+        :return: the rotated data
+        :rtype: LoPropData
+    """
+    multipoles = {}
+    for l, values in data.multipoles.items():
+        if l == 0:
+            multipoles[l] = [list(v) for v in values]
+        elif l == 1:
+            multipoles[l] = [list(rotation.dot(v)) for v in values]
+        else:
+            multipoles[l] = [pack_symmetric(rotation.dot(unpack_symmetric(v)).dot(rotation.T)) for v in values]
+
+    polarizabilities = [list(v) for v in data.polarizabilities]
+    if data.get_polarizability_order() == 2:
+        polarizabilities = [pack_symmetric(rotation.dot(unpack_symmetric(v)).dot(rotation.T)) for v in data.polarizabilities]
+
+    return LoPropData(coordinates, multipoles, polarizabilities)
@@ -0,0 +1,102 @@
+""" Manifest of the generated input files of a workspace
+
+For every generated file the manifest records a digest of the data it
+was generated from together with the size and modification time of the
+file when it was written. A file is up to date if it is generated from
+data with the same digest and has not been changed since.
+"""
+import json
+import os
+import tempfile
+import threading
+
+
+class WorkspaceManifest(object):
+    """ Records the digests of the generated files of a workspace """
+
+    def __init__(self, filename):
+        """ Initializes the manifest
+
+            :param filename: the manifest file. It is created when the manifest is saved.
+            :type filename: str
+        """
+        self.filename = filename
+        self._lock = threading.Lock()
+        self._entries = self._read()
+        self._modified = False
+
+    def get_digest(self, member):
+        """ Returns the recorded digest of a file or None if it is not known
+
+            :param member: the name of the file (relative to the workspace)
+            :type member: str
+            :rtype: str
+        """
+        entry = self._entries.get(member)
+        if entry is None:
+            return None
+        return entry[0]
+
+    def is_current(self, member, filename, digest):
+        """ Returns whether a file is generated from data with a digest and unchanged since
+
+            :param member: the name of the file (relative to the workspace)
+            :type member: str
+            :param filename: the file on disk
+            :type filename: str
+            :param digest: digest of the data the file is generated from
+            :type digest: str
+            :rtype: bool
+        """
+        entry = self._entries.get(member)
+        if entry is None or entry[0] != digest:
+            return False
+
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            return False
+        return entry[1] == stat.st_size and entry[2] == stat.st_mtime_ns
+
+    def record(self, member, filename, digest):
+        """ Records that a file was generated from data with a digest
+
+            :param member: the name of the file (relative to the workspace)
+            :type member: str
+            :param filename: the file on disk
+            :type filename: str
+            :param digest: digest of the data the file is generated from
+            :type digest: str
+        """
+        stat = os.stat(filename)
+        with self._lock:
+            self._entries[member] = [digest, stat.st_size, stat.st_mtime_ns]
+            self._modified = True
+
+    def save(self):
+        """ Writes the manifest if anything was recorded """
+        with self._lock:
+            if not self._modified:
+                return
+
+            directory = os.path.dirname(os.path.abspath(self.filename))
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_filename = tempfile.mkstemp(dir=directory)
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self._entries, f)
+            os.replace(temp_filename, self.filename)
+            self._modified = False
+
+    def _read(self):
+        if not os.path.exists(self.filename):
+            return {}
+
+        try:
+            with open(self.filename, 'r') as f:
+                entries = json.load(f)
+        except (IOError, ValueError):  # a broken manifest only means files are written again
+            return {}
+
+        if not isinstance(entries, dict):
+            return {}
+        return entries
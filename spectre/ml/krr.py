@@ -0,0 +1,333 @@
+""" Kernel ridge regression of atomic properties with NumPy only
+
+An alternative to the FCHL models of :mod:`spectre.ml.prediction` that
+needs neither qml nor compiled kernels. Atoms are described by
+atom-centred features: for every element of the model, the distances to
+the neighbouring atoms of that element are smeared by Gaussians on a
+grid of radii and damped by a cosine cutoff. The distances between
+pairs of neighbours are smeared the same way so the features also
+depend on the angles around an atom. Atoms are compared with a Gaussian
+kernel of their features and only to training atoms of the same element.
+
+A model is stored as a .npz file (NAME_krr.npz next to the FCHL model
+NAME.npz) with the regression coefficients of the charges (alpha_q) and
+polarizabilities (alpha_p), the features (descriptors) and nuclear
+charges (nuclear_charges) of the training atoms, the kernel width
+(sigma), the number of atoms of a molecule (max_size) and the settings
+of the descriptor (elements, centers, width and cut_distance).
+
+Models are trained from LoProp calculations with :mod:`spectre.ml.train`.
+"""
+import numpy
+
+from spectre.errors import SpectreValueError
+from spectre.hashing import file_digest
+from spectre.ml.models import MLModel, _mmap_array
+
+FILE_SUFFIX = "_krr.npz"
+
+# default settings of the descriptor (distances in Angstrom) and the regression
+DEFAULT_NUM_CENTERS = 24
+DEFAULT_WIDTH = 0.25
+DEFAULT_CUT_DISTANCE = 6.0
+DEFAULT_SIGMA = 1.0
+DEFAULT_REGULARIZATION = 1.0e-8
+
+
+def radial_descriptors(nuclear_charges, coordinates, elements, centers, width, cut_distance):
+    """ Computes the features of all atoms of molecules of the same species
+
+        The features of an atom are the radial functions of its neighbours
+        of each element followed by the radial functions of the distances
+        between pairs of its neighbours (weighted by the cutoffs of both).
+
+        :param nuclear_charges: the nuclear charges of the atoms of a molecule
+        :type nuclear_charges: numpy.ndarray
+        :param coordinates: the coordinates (in Angstrom) of the atoms of each molecule (molecules x atoms x 3)
+        :type coordinates: numpy.ndarray
+        :param elements: the nuclear charges of the elements that get features
+        :type elements: numpy.ndarray
+        :param centers: the radii (in Angstrom) of the Gaussians
+        :type centers: numpy.ndarray
+        :param width: the width (in Angstrom) of the Gaussians
+        :type width: float
+        :param cut_distance: the distance (in Angstrom) beyond which neighbours are ignored
+        :type cut_distance: float
+        :return: the features of each atom (molecules x atoms x ((elements + 1) * centers))
+        :rtype: numpy.ndarray
+    """
+    coordinates = numpy.asarray(coordinates, dtype=float)
+    num_molecules, num_atoms, _ = coordinates.shape
+
+    dr = coordinates[:, :, numpy.newaxis, :] - coordinates[:, numpy.newaxis, :, :]
+    distances = numpy.sqrt(numpy.einsum('mijk,mijk->mij', dr, dr))
+    cutoff = numpy.where(distances < cut_distance, 0.5 * (numpy.cos(numpy.pi * distances / cut_distance) + 1.0), 0.0)
+    cutoff[:, numpy.arange(num_atoms), numpy.arange(num_atoms)] = 0.0  # an atom is not its own neighbour
+
+    gaussians = numpy.exp(-(distances[..., numpy.newaxis] - centers)**2 / (2.0 * width**2))
+    gaussians[:, numpy.arange(num_atoms), numpy.arange(num_atoms)] = 0.0
+    element_mask = numpy.equal.outer(numpy.asarray(nuclear_charges), numpy.asarray(elements)).astype(float)
+    radial = numpy.einsum('mijk,mij,je->miek', gaussians, cutoff, element_mask)
+
+    # each pair of neighbours j and l of atom i is counted twice
+    angular = 0.5 * numpy.einsum('mij,mil,mjlk->mik', cutoff, cutoff, gaussians, optimize=True)
+    return numpy.concatenate([radial.reshape(num_molecules, num_atoms, -1), angular], axis=2)
+
+
+def gaussian_kernel(descriptors_a, nuclear_charges_a, descriptors_b, nuclear_charges_b, sigma):
+    """ Computes the Gaussian kernel between two sets of atoms
+
+        Atoms of different elements do not contribute to each other.
+
+        :param descriptors_a: features of the first set of atoms (atoms x features)
+        :type descriptors_a: numpy.ndarray
+        :param nuclear_charges_a: nuclear charges of the first set of atoms
+        :type nuclear_charges_a: numpy.ndarray
+        :param descriptors_b: features of the second set of atoms (atoms x features)
+        :type descriptors_b: numpy.ndarray
+        :param nuclear_charges_b: nuclear charges of the second set of atoms
+        :type nuclear_charges_b: numpy.ndarray
+        :param sigma: the width of the kernel
+        :type sigma: float
+        :return: the kernel (atoms of a x atoms of b)
+        :rtype: numpy.ndarray
+    """
+    squared = numpy.einsum('ij,ij->i', descriptors_a, descriptors_a)[:, numpy.newaxis] + \
+        numpy.einsum('ij,ij->i', descriptors_b, descriptors_b)[numpy.newaxis, :] - \
+        2.0 * descriptors_a.dot(descriptors_b.T)
+    kernel = numpy.exp(-numpy.maximum(squared, 0.0) / (2.0 * sigma**2))
+    kernel *= numpy.equal.outer(numpy.asarray(nuclear_charges_a), numpy.asarray(nuclear_charges_b))
+    return kernel
+
+
+def molecule_arrays(molecules):
+    """ Returns the nuclear charges and the coordinates of molecules of the same species
+
+        :param molecules: the molecules
+        :type molecules: list[Molecule]
+        :raises SpectreValueError: the molecules do not have the same atoms
+        :return: the nuclear charges of the atoms and the coordinates (in Angstrom) of each molecule
+        :rtype: tuple[numpy.ndarray, numpy.ndarray]
+    """
+    nuclear_charges = numpy.array(molecules[0].get_nuclear_charges())
+    coordinates = numpy.empty((len(molecules), len(nuclear_charges), 3))
+    for i, molecule in enumerate(molecules):
+        charges = molecule.get_nuclear_charges()
+        if len(charges) != len(nuclear_charges) or numpy.any(nuclear_charges != charges):
+            raise SpectreValueError("Molecule {0:d} ({1:s}) does not have the atoms of the model.".format(
+                i + 1, molecule.get_name()))
+        coordinates[i] = molecule.get_coordinates()
+    return nuclear_charges, coordinates
+
+
+class KRRModel(MLModel):
+    """ A kernel ridge regression model of atomic charges and polarizabilities with radial features """
+
+    def __init__(self, filename, digest, coefficients, descriptors, nuclear_charges, sigma, max_size,
+                 elements, centers, width, cut_distance):
+        """ Initializes the model
+
+            :param filename: the file of the model
+            :type filename: str
+            :param digest: digest of the file of the model
+            :type digest: str
+            :param coefficients: regression coefficients by name (see COEFFICIENTS)
+            :type coefficients: dict[str, numpy.ndarray]
+            :param descriptors: features of the training atoms (atoms x features)
+            :type descriptors: numpy.ndarray
+            :param nuclear_charges: nuclear charges of the training atoms
+            :type nuclear_charges: numpy.ndarray
+            :param sigma: width of the kernel
+            :type sigma: float
+            :param max_size: number of atoms in a molecule
+            :type max_size: int
+            :param elements: nuclear charges of the elements that get features
+            :type elements: numpy.ndarray
+            :param centers: radii of the Gaussians of the features
+            :type centers: numpy.ndarray
+            :param width: width of the Gaussians of the features
+            :type width: float
+            :param cut_distance: cutoff distance of the features
+            :type cut_distance: float
+        """
+        MLModel.__init__(self, filename, digest, coefficients, descriptors, numpy.atleast_1d(sigma), max_size,
+                         cut_distance)
+        self.nuclear_charges = numpy.asarray(nuclear_charges)
+        self.elements = numpy.asarray(elements)
+        self.centers = numpy.asarray(centers, dtype=float)
+        self.width = width
+
+    @classmethod
+    def from_file(cls, filename, digest=None, mmap_directory=None):
+        """ Loads a model from a .npz file
+
+            :param filename: the file of the model
+            :type filename: str
+            :param digest: digest of the file. It is computed if not given.
+            :type digest: str
+            :param mmap_directory: directory where the training features are extracted to be memory-mapped. If None, they are kept in memory.
+            :type mmap_directory: str
+            :rtype: KRRModel
+        """
+        if digest is None:
+            digest = file_digest(filename)
+
+        with numpy.load(filename) as ml_data:
+            coefficients = {key: numpy.array(ml_data[key]) for key in cls.COEFFICIENTS}
+            if mmap_directory is None:
+                descriptors = numpy.array(ml_data['descriptors'])
+            else:
+                descriptors = _mmap_array(ml_data, 'descriptors', mmap_directory, digest)
+            return cls(filename, digest, coefficients, descriptors,
+                       numpy.array(ml_data['nuclear_charges']),
+                       float(ml_data['sigma'][0]),
+                       int(ml_data['max_size'][0]),
+                       numpy.array(ml_data['elements']),
+                       numpy.array(ml_data['centers']),
+                       float(ml_data['width'][0]),
+                       float(ml_data['cut_distance'][0]))
+
+    def save(self, filename):
+        """ Saves the model to a .npz file
+
+            :param filename: the file of the model
+            :type filename: str
+        """
+        coefficients = {key: getattr(self, key) for key in self.COEFFICIENTS}
+        with open(filename, 'wb') as f:
+            numpy.savez(f,
+                        descriptors=numpy.asarray(self.representation),
+                        nuclear_charges=self.nuclear_charges,
+                        sigma=self.sigmas,
+                        max_size=numpy.array([self.max_size]),
+                        elements=self.elements,
+                        centers=self.centers,
+                        width=numpy.array([self.width]),
+                        cut_distance=numpy.array([self.cut_distance]),
+                        **coefficients)
+
+    def describe(self, nuclear_charges, coordinates):
+        """ Returns the features of the atoms of molecules (see :func:`radial_descriptors`) """
+        return radial_descriptors(nuclear_charges, coordinates, self.elements, self.centers, self.width,
+                                  self.cut_distance)
+
+    def get_kernel(self, descriptors, nuclear_charges):
+        """ Returns the kernel between the training atoms and other atoms
+
+            :param descriptors: features of the atoms (atoms x features)
+            :type descriptors: numpy.ndarray
+            :param nuclear_charges: nuclear charges of the atoms
+            :type nuclear_charges: numpy.ndarray
+            :rtype: numpy.ndarray
+        """
+        return gaussian_kernel(self.representation, self.nuclear_charges, descriptors, nuclear_charges,
+                               self.sigmas[0])
+
+    def molecules_per_chunk(self, max_memory):
+        """ Returns how many molecules can be predicted at once within a memory budget
+
+            The memory of a chunk is dominated by the kernel between the
+            training atoms and the atoms of the chunk and the radial
+            functions of all pairs of atoms of the chunk.
+
+            :param max_memory: the memory budget in MB
+            :type max_memory: float
+            :rtype: int
+        """
+        bytes_per_molecule = 8 * self.max_size * (2 * self.get_num_training_atoms() +
+                                                  2 * self.max_size * len(self.centers) +
+                                                  (len(self.elements) + 1) * len(self.centers))
+        return max(1, int(max_memory * 1024**2 // bytes_per_molecule))
+
+
+def predict_atomic_values(molecules, model, chunk_size=None):
+    """ Predicts the atomic values of all coefficients of a model for molecules
+
+        :param molecules: the molecules. They must have the atoms of the model.
+        :type molecules: list[Molecule]
+        :param model: the model of the species of the molecules
+        :type model: KRRModel
+        :param chunk_size: number of molecules predicted at once. If None, all molecules are predicted at once.
+        :type chunk_size: int
+        :return: the values (one row for each row of the coefficients) of all atoms
+        :rtype: numpy.ndarray
+    """
+    nuclear_charges, coordinates = molecule_arrays(molecules)
+    num_atoms = len(nuclear_charges)
+    if num_atoms != model.max_size or numpy.any(nuclear_charges != model.nuclear_charges[:num_atoms]):
+        raise SpectreValueError("The molecules ({0:s}) do not have the atoms of the model.".format(
+            molecules[0].get_name()))
+    if chunk_size is None:
+        chunk_size = len(molecules)
+    chunk_size = max(1, chunk_size)
+
+    properties = numpy.empty((len(model.alphas), len(molecules) * num_atoms))
+    for start in range(0, len(molecules), chunk_size):
+        chunk = coordinates[start:start+chunk_size]
+        descriptors = model.describe(nuclear_charges, chunk).reshape(len(chunk) * num_atoms, -1)
+        kernel = model.get_kernel(descriptors, numpy.tile(nuclear_charges, len(chunk)))
+        properties[:, start*num_atoms:(start+len(chunk))*num_atoms] = model.alphas.dot(kernel)
+    return properties
+
+
+def atomic_properties(molecules, model, chunk_size=None, num_processes=1):
+    """ Predicts atomic charges and polarizabilities of molecules
+
+        Same interface as :func:`spectre.ml.prediction.atomic_properties`.
+        The kernels are evaluated by NumPy in the calling process so the
+        number of processes is not used.
+
+        :param molecules: the molecules
+        :type molecules: list[Molecule]
+        :param model: the model of the species of the molecules
+        :type model: KRRModel
+        :param chunk_size: number of molecules predicted at once. If None, all molecules are predicted at once.
+        :type chunk_size: int
+        :param num_processes: not used
+        :type num_processes: int
+        :return: charges and polarizabilities of all atoms and the number of atoms of a molecule
+        :rtype: tuple[numpy.ndarray, numpy.ndarray, int]
+    """
+    properties = predict_atomic_values(molecules, model, chunk_size)
+    return properties[0], properties[1], model.max_size
+
+
+def train_model(molecules, charges, polarizabilities, sigma=DEFAULT_SIGMA, regularization=DEFAULT_REGULARIZATION,
+                num_centers=DEFAULT_NUM_CENTERS, width=DEFAULT_WIDTH, cut_distance=DEFAULT_CUT_DISTANCE):
+    """ Trains a model of atomic charges and isotropic polarizabilities
+
+        :param molecules: the training molecules. They must have the same atoms.
+        :type molecules: list[Molecule]
+        :param charges: atomic charges of each molecule (molecules x atoms)
+        :type charges: numpy.ndarray
+        :param polarizabilities: isotropic atomic polarizabilities of each molecule (molecules x atoms)
+        :type polarizabilities: numpy.ndarray
+        :param sigma: width of the kernel
+        :type sigma: float
+        :param regularization: added to the diagonal of the kernel
+        :type regularization: float
+        :param num_centers: number of Gaussians of the radial features of each element
+        :type num_centers: int
+        :param width: width (in Angstrom) of the Gaussians
+        :type width: float
+        :param cut_distance: cutoff distance (in Angstrom) of the features
+        :type cut_distance: float
+        :rtype: KRRModel
+    """
+    nuclear_charges, coordinates = molecule_arrays(molecules)
+    num_atoms = len(nuclear_charges)
+    elements = numpy.unique(nuclear_charges)
+    centers = numpy.linspace(0.0, cut_distance, num_centers)
+
+    descriptors = radial_descriptors(nuclear_charges, coordinates, elements, centers, width, cut_distance)
+    descriptors = descriptors.reshape(len(molecules) * num_atoms, -1)
+    training_charges = numpy.tile(nuclear_charges, len(molecules))
+
+    kernel = gaussian_kernel(descriptors, training_charges, descriptors, training_charges, sigma)
+    kernel[numpy.diag_indices_from(kernel)] += regularization
+    targets = numpy.vstack([numpy.ravel(charges), numpy.ravel(polarizabilities)])
+    alphas = numpy.linalg.solve(kernel, targets.T).T
+
+    coefficients = {"alpha_q": alphas[0], "alpha_p": alphas[1]}
+    return KRRModel(None, None, coefficients, descriptors, training_charges, sigma, num_atoms, elements, centers,
+                    width, cut_distance)
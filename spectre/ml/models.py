@@ -0,0 +1,238 @@
+""" Machine-learned models of atomic charges and polarizabilities
+
+A model is stored as a .npz file with the regression coefficients of
+the charges (alpha_q) and polarizabilities (alpha_p), the representation
+of the training atoms, the kernel widths (sigma) and the settings of
+the representation (max_size and cut_distance).
+
+Models of the excited states of a chromophore use the same format with
+the coefficients of the transition density fitted charges (alpha_tq)
+and of the atomic contributions to the excitation energies (alpha_e)
+of each excited state instead (see :class:`MLExcitedStateModel`).
+
+Models are loaded through a :class:`ModelRegistry` which keeps the most
+recently used models in memory keyed by filename and file digest, so a
+long-lived process (or a trajectory of frames) loads a model only once.
+The representation of the training atoms is extracted to a .npy file
+once and memory-mapped from then on.
+"""
+import collections
+import os
+import tempfile
+import threading
+
+import numpy
+
+from spectre.hashing import file_digest
+
+DEFAULT_MMAP_DIRECTORY = os.path.join(os.path.expanduser("~"), ".spectre", "ml")
+
+
+class MLModel(object):
+    """ A machine-learned model of atomic charges and polarizabilities """
+
+    # the regression coefficients of the model in the order they are predicted
+    COEFFICIENTS = ("alpha_q", "alpha_p")
+
+    def __init__(self, filename, digest, coefficients, representation, sigmas, max_size, cut_distance):
+        """ Initializes the model
+
+            :param filename: the file of the model
+            :type filename: str
+            :param digest: digest of the file of the model
+            :type digest: str
+            :param coefficients: regression coefficients by name (see COEFFICIENTS). They are also set as attributes.
+            :type coefficients: dict[str, numpy.ndarray]
+            :param representation: representation of the training atoms
+            :type representation: numpy.ndarray
+            :param sigmas: kernel widths
+            :type sigmas: numpy.ndarray
+            :param max_size: maximum number of atoms in a molecule
+            :type max_size: int
+            :param cut_distance: cutoff distance of the representation
+            :type cut_distance: float
+        """
+        self.filename = filename
+        self.digest = digest
+        for key in self.COEFFICIENTS:
+            setattr(self, key, coefficients[key])
+        self.representation = representation
+        self.sigmas = sigmas
+        self.max_size = max_size
+        self.cut_distance = cut_distance
+
+        # the coefficients of all properties so they are predicted by a single product with the kernel
+        self.alphas = numpy.vstack([coefficients[key] for key in self.COEFFICIENTS])
+
+        # terms of the kernel that only depend on the training atoms (see :meth:`get_kernel_term`)
+        self._kernel_terms = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, filename, digest=None, mmap_directory=None):
+        """ Loads a model from a .npz file
+
+            :param filename: the file of the model
+            :type filename: str
+            :param digest: digest of the file. It is computed if not given.
+            :type digest: str
+            :param mmap_directory: directory where the training representation is extracted to be memory-mapped. If None, it is kept in memory.
+            :type mmap_directory: str
+            :rtype: MLModel
+        """
+        if digest is None:
+            digest = file_digest(filename)
+
+        with numpy.load(filename) as ml_data:
+            coefficients = {key: numpy.array(ml_data[key]) for key in cls.COEFFICIENTS}
+            sigmas = numpy.array(ml_data['sigma'])
+            max_size = int(ml_data['max_size'][0])
+            cut_distance = float(ml_data['cut_distance'][0])
+            if mmap_directory is None:
+                representation = numpy.array(ml_data['representation'])
+            else:
+                representation = _mmap_array(ml_data, 'representation', mmap_directory, digest)
+
+        return cls(filename, digest, coefficients, representation, sigmas, max_size, cut_distance)
+
+    def get_kernel_term(self, key, compute):
+        """ Returns a term of the kernel that only depends on the training atoms
+
+            The term is computed on first use and kept with the model.
+
+            :param key: the name of the term
+            :type key: str
+            :param compute: function computing the term from the model
+            :return: the term
+        """
+        with self._lock:
+            if key not in self._kernel_terms:
+                self._kernel_terms[key] = compute(self)
+            return self._kernel_terms[key]
+
+    def get_num_training_atoms(self):
+        """ Returns the number of atoms in the training set """
+        return len(self.representation)
+
+    def molecules_per_chunk(self, max_memory):
+        """ Returns how many molecules can be predicted at once within a memory budget
+
+            The memory of a chunk is dominated by the kernel between the
+            training atoms and the atoms of the chunk (for every kernel
+            width) and the representation of the atoms of the chunk.
+
+            :param max_memory: the memory budget in MB
+            :type max_memory: float
+            :rtype: int
+        """
+        bytes_per_atom = 8 * (len(self.sigmas) * self.get_num_training_atoms() + 5 * self.max_size)
+        return max(1, int(max_memory * 1024**2 // (bytes_per_atom * self.max_size)))
+
+    def __repr__(self):
+        return "{0:s}('{1}')".format(type(self).__name__, self.filename)
+
+
+class MLExcitedStateModel(MLModel):
+    """ A machine-learned model of the excited states of a chromophore
+
+        Each row of the coefficients belongs to an excited state. The
+        transition density fitted charges are predicted for each atom and
+        the excitation energy is the sum of the predicted contributions of
+        the atoms of the chromophore.
+    """
+
+    COEFFICIENTS = ("alpha_tq", "alpha_e")
+
+    def get_num_excited_states(self):
+        """ Returns the number of excited states predicted by the model """
+        return len(numpy.atleast_2d(self.alpha_e))
+
+
+def _mmap_array(ml_data, key, directory, digest):
+    """ Returns an array of an .npz file memory-mapped from a .npy file extracted once """
+    filename = os.path.join(directory, "{0:s}.{1:s}.npy".format(digest[:32], key))
+    if not os.path.exists(filename):
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_filename = tempfile.mkstemp(dir=directory, suffix=".npy")
+        with os.fdopen(fd, 'wb') as f:
+            numpy.save(f, ml_data[key])
+        os.replace(temp_filename, filename)
+    return numpy.load(filename, mmap_mode='r')
+
+
+class ModelRegistry(object):
+    """ A bounded, least recently used collection of loaded models """
+
+    def __init__(self, max_models=8, mmap_directory=DEFAULT_MMAP_DIRECTORY):
+        """ Initializes the registry
+
+            :param max_models: maximum number of models kept in memory
+            :type max_models: int
+            :param mmap_directory: directory where training representations are extracted to be memory-mapped
+            :type mmap_directory: str
+        """
+        self.max_models = max(1, max_models)
+        self.mmap_directory = mmap_directory
+        self._models = collections.OrderedDict()
+        self._digests = {}
+        self._lock = threading.RLock()
+
+    def get(self, filename, model_class=MLModel):
+        """ Returns the model of a file, loading it if needed
+
+            A model is loaded again if its file changed.
+
+            :param filename: the file of the model
+            :type filename: str
+            :param model_class: the type of model stored in the file
+            :type model_class: type
+            :rtype: MLModel
+        """
+        filename = os.path.abspath(filename)
+        with self._lock:
+            key = (filename, self._get_digest(filename), model_class)
+            model = self._models.get(key)
+            if model is not None:
+                self._models.move_to_end(key)
+                return model
+
+            model = model_class.from_file(filename, key[1], self.mmap_directory)
+            self._models[key] = model
+            while len(self._models) > self.max_models:
+                self._models.popitem(last=False)
+            return model
+
+    def clear(self):
+        """ Removes all models """
+        with self._lock:
+            self._models.clear()
+            self._digests.clear()
+
+    def __len__(self):
+        return len(self._models)
+
+    def _get_digest(self, filename):
+        """ Returns the digest of a file. It is only computed again if the file changed. """
+        stat = os.stat(filename)
+        signature = (stat.st_size, stat.st_mtime_ns)
+        entry = self._digests.get(filename)
+        if entry is None or entry[0] != signature:
+            entry = (signature, file_digest(filename))
+            self._digests[filename] = entry
+        return entry[1]
+
+
+# the models of the calculation
+REGISTRY = ModelRegistry()
+
+
+def load_model(filename, model_class=MLModel):
+    """ Returns a model from the registry of the calculation (see :meth:`ModelRegistry.get`)
+
+        :param filename: the file of the model
+        :type filename: str
+        :param model_class: the type of model stored in the file
+        :type model_class: type
+        :rtype: MLModel
+    """
+    return REGISTRY.get(filename, model_class)
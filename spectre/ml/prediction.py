@@ -1,11 +1,16 @@
+import functools
+import multiprocessing
+
 import numpy
 import qml
 from qml import Compound
 import qml.fchl
 import qml.math
 
+from spectre.molecool.util import Z2LABEL
+
 
-def representations_from_files(files, max_size, cut_distance):
+def representations_from_files(files, max_size, cut_distance, pool=None):
     """ Constructs FCHL representations directly from files
 
         basically wraps :func:`compounds_from_files` and :func:`representations_from_compounds`
@@ -16,9 +21,15 @@ def representations_from_files(files, max_size, cut_distance):
     :type max_size: int
     :param cut_distance: cutoff distance
     :type cut_distance: float
+    :param pool: pool of processes generating the representations. Generated in serial if None.
+    :type pool: multiprocessing.Pool
     :return: The representation of all compounds given as input
     :rtype: numpy.ndarray
     """
+    if pool is not None:
+        # the workers read the files themselves so only the representations are sent back
+        func = functools.partial(fchl_representation_from_file, max_size=max_size, cut_distance=cut_distance)
+        return restructure_representation(numpy.array(pool.map(func, files, chunksize=map_chunk_size(files, pool))))
 
     compounds = compounds_from_files(files)
     return representations_from_compounds(compounds, max_size, cut_distance)
@@ -35,21 +46,109 @@ def compounds_from_files(files):
     return [Compound(file) for file in files]
 
 
-def representations_from_compounds(compounds, max_size, cut_distance):
+def compounds_from_molecules(molecules):
+    """ Generates a list of :class:`qml.Compound` directly from molecules
+
+        The compounds get the nuclear charges and coordinates of the
+        molecules so nothing is written to (or read from) disk.
+
+    :param molecules: the molecules
+    :type molecules: list[Molecule]
+    :return: list of qml compounds
+    :rtype: list[Compound]
+    """
+    return [compound_from_molecule(molecule) for molecule in molecules]
+
+
+def compound_from_molecule(molecule):
+    """ Generates a :class:`qml.Compound` from a molecule (see :func:`compounds_from_molecules`)
+
+    :param molecule: the molecule
+    :type molecule: Molecule
+    :rtype: Compound
+    """
+    compound = Compound()
+    nuclear_charges = molecule.get_nuclear_charges()
+    compound.natoms = len(nuclear_charges)
+    compound.atomtypes = [Z2LABEL[int(z)] for z in nuclear_charges]
+    compound.nuclear_charges = numpy.array(nuclear_charges, dtype=numpy.int32)
+    compound.coordinates = numpy.array(molecule.get_coordinates(), dtype=numpy.float64)
+    compound.name = molecule.get_name()
+    return compound
+
+
+def representations_from_molecules(molecules, max_size, cut_distance, pool=None):
+    """ Constructs FCHL representations directly from molecules
+
+        basically wraps :func:`compounds_from_molecules` and :func:`representations_from_compounds`
+
+    :param molecules: the molecules
+    :type molecules: list[Molecule]
+    :param max_size: the maximum size of the representation
+    :type max_size: int
+    :param cut_distance: cutoff distance
+    :type cut_distance: float
+    :param pool: pool of processes generating the representations. Generated in serial if None.
+    :type pool: multiprocessing.Pool
+    :return: The representation of all molecules given as input
+    :rtype: numpy.ndarray
+    """
+    compounds = compounds_from_molecules(molecules)
+    return representations_from_compounds(compounds, max_size, cut_distance, pool)
+
+
+def representations_from_compounds(compounds, max_size, cut_distance, pool=None):
     """ Generates representations from compounds
 
+        The representations are in the order of the compounds also when
+        they are generated by a pool of processes.
+
         :param compounds: compounds used to generate represenatation vector
         :type compounds: list[Compound]
         :param max_size: the maximum size of the representation
         :type max_size: int
         :param cut_distance: cutoff distance
         :type cut_distance: float
+        :param pool: pool of processes generating the representations. Generated in serial if None.
+        :type pool: multiprocessing.Pool
         :return: The representation of all compounds given as input
         :rtype: numpy.ndarray
     """
-    for compound in compounds:
-        compound.generate_fchl_representation(max_size=max_size, cut_distance=cut_distance)
-    return restructure_representation(numpy.array([mol.representation for mol in compounds]))
+    func = functools.partial(fchl_representation, max_size=max_size, cut_distance=cut_distance)
+    if pool is None:
+        representations = [func(compound) for compound in compounds]
+    else:
+        representations = pool.map(func, compounds, chunksize=map_chunk_size(compounds, pool))
+    return restructure_representation(numpy.array(representations))
+
+
+def fchl_representation(compound, max_size, cut_distance):
+    """ Generates the FCHL representation of a compound
+
+        :param compound: the compound
+        :type compound: Compound
+        :param max_size: the maximum size of the representation
+        :type max_size: int
+        :param cut_distance: cutoff distance
+        :type cut_distance: float
+        :return: the representation of the compound
+        :rtype: numpy.ndarray
+    """
+    compound.generate_fchl_representation(max_size=max_size, cut_distance=cut_distance)
+    return compound.representation
+
+
+def fchl_representation_from_file(filename, max_size, cut_distance):
+    """ Generates the FCHL representation of the compound in a file (see :func:`fchl_representation`) """
+    return fchl_representation(Compound(filename), max_size, cut_distance)
+
+
+def map_chunk_size(items, pool):
+    """ Returns the number of items sent to a worker of a pool at once
+
+        A few chunks per worker balance the load without sending every item on its own.
+    """
+    return max(1, len(items) // (4 * pool._processes))
 
 
 def restructure_representation(X):
@@ -64,17 +163,86 @@ def restructure_representation(X):
     return X.reshape(number_of_molecules * nat, dim, cut)
 
 
-def atomic_properties(filenames, ml_data):
-    alpha_p = ml_data['alpha_p']
-    alpha_q = ml_data['alpha_q']
-    repr_train = ml_data['representation']
-    sigmas = ml_data['sigma']
-    max_size = ml_data['max_size'][0]
-    cut_distance = ml_data['cut_distance'][0]
-
-    # construct representation from files
-    repr_predict = representations_from_files(filenames, max_size, cut_distance)
-    kernel_predict = qml.fchl.get_atomic_kernels(repr_train, repr_predict, sigmas, alchemy='off')[0]
-    all_pols = alpha_p.dot(kernel_predict)
-    all_charges = alpha_q.dot(kernel_predict)
-    return all_charges, all_pols, max_size
+def atomic_properties(molecules, model, chunk_size=None, num_processes=1):
+    """ Predicts atomic charges and polarizabilities of molecules
+
+        :param molecules: the molecules
+        :type molecules: list[Molecule]
+        :param model: the model of the species of the molecules
+        :type model: spectre.ml.models.MLModel
+        :param chunk_size: number of molecules predicted at once. If None, all molecules are predicted at once.
+        :type chunk_size: int
+        :param num_processes: number of processes generating the representations of the molecules
+        :type num_processes: int
+        :return: charges and polarizabilities of all atoms (max_size atoms per molecule) and max_size
+        :rtype: tuple[numpy.ndarray, numpy.ndarray, int]
+    """
+    properties = predict_atomic_values(molecules, model, chunk_size, num_processes)
+    return properties[0], properties[1], model.max_size
+
+
+def excited_state_properties(molecules, model, chunk_size=None, num_processes=1):
+    """ Predicts excitation energies and transition density fitted charges of chromophores
+
+        :param molecules: the chromophores
+        :type molecules: list[Molecule]
+        :param model: the excited state model of the species of the chromophores
+        :type model: spectre.ml.models.MLExcitedStateModel
+        :param chunk_size: number of molecules predicted at once. If None, all molecules are predicted at once.
+        :type chunk_size: int
+        :param num_processes: number of processes generating the representations of the molecules
+        :type num_processes: int
+        :return: excitation energies (molecules x states) and transition charges (molecules x states x max_size)
+        :rtype: tuple[numpy.ndarray, numpy.ndarray]
+    """
+    num_states = model.get_num_excited_states()
+    properties = predict_atomic_values(molecules, model, chunk_size, num_processes)
+    properties = properties.reshape(2 * num_states, len(molecules), model.max_size)
+    transition_charges = properties[:num_states].transpose(1, 0, 2)
+    energies = properties[num_states:].sum(axis=2).T
+    return energies, transition_charges
+
+
+def predict_atomic_values(molecules, model, chunk_size=None, num_processes=1):
+    """ Predicts the atomic values of all coefficients of a model for molecules
+
+        The molecules are predicted in chunks so the kernel between the
+        training atoms and the atoms being predicted is bounded in size.
+        The results of each chunk are written into a preallocated array.
+
+        :param molecules: the molecules
+        :type molecules: list[Molecule]
+        :param model: the model of the species of the molecules
+        :type model: spectre.ml.models.MLModel
+        :param chunk_size: number of molecules predicted at once. If None, all molecules are predicted at once.
+        :type chunk_size: int
+        :param num_processes: number of processes generating the representations of the molecules
+        :type num_processes: int
+        :return: the values (one row for each row of the coefficients) of all atoms (max_size atoms per molecule)
+        :rtype: numpy.ndarray
+    """
+    max_size = model.max_size
+    if chunk_size is None:
+        chunk_size = len(molecules)
+    chunk_size = max(1, chunk_size)
+
+    pool = None
+    if num_processes > 1 and len(molecules) > 1:
+        pool = multiprocessing.Pool(processes=num_processes)
+
+    # one row for each row of coefficients of the model
+    properties = numpy.empty((len(model.alphas), len(molecules) * max_size))
+    try:
+        for start in range(0, len(molecules), chunk_size):
+            chunk_molecules = molecules[start:start+chunk_size]
+
+            # construct representation from the molecules in memory
+            repr_predict = representations_from_molecules(chunk_molecules, max_size, model.cut_distance, pool)
+            kernel_predict = qml.fchl.get_atomic_kernels(model.representation, repr_predict, model.sigmas,
+                                                         alchemy='off')[0]
+            properties[:, start*max_size:(start+len(chunk_molecules))*max_size] = model.alphas.dot(kernel_predict)
+    finally:
+        if pool is not None:
+            pool.close()
+
+    return properties
@@ -0,0 +1,139 @@
+""" Trains kernel ridge regression models (see :mod:`spectre.ml.krr`) from LoProp calculations
+
+The training data are the molecules of a species that were computed
+with LoProp in the workspace of an earlier SPECTRE calculation. For each
+molecule NNNN_NAME the coordinates are read from NNNN_NAME.xyz and the
+charges and polarizabilities from NNNN_NAME_dalton_loprop.loprop. Files
+are read from disk or from the archive of the workspace.
+
+    python -m spectre.ml.train WORKSPACE NAME [-o NAME_krr.npz]
+"""
+import argparse
+import os
+
+import numpy
+
+import spectre.loprop
+import spectre.ml.krr
+from spectre.errors import SpectreRuntimeError
+from spectre.molecool.atom import Atom
+from spectre.molecool.molecule import Molecule
+from spectre.molecool.util import LABEL2Z
+from spectre.workspace import Workspace
+
+
+def read_xyz_molecule(xyz_file):
+    """ Reads a molecule from an open .xyz file
+
+        :param xyz_file: the file to read from
+        :type xyz_file: io.TextIOBase
+        :rtype: Molecule
+    """
+    lines = xyz_file.read().splitlines()
+    num_atoms = int(lines[0])
+    molecule = Molecule()
+    molecule.set_name(lines[1].strip())
+    for line in lines[2:2+num_atoms]:
+        tokens = line.split()
+        molecule.add_atom(Atom(LABEL2Z[tokens[0]], xyz=numpy.array(list(map(float, tokens[1:4])))))
+    return molecule
+
+
+def isotropic_polarizabilities(data):
+    """ Returns the isotropic polarizability of each atom of LoProp data
+
+        :param data: the LoProp data
+        :type data: spectre.loprop.LoPropData
+        :rtype: numpy.ndarray
+    """
+    if data.get_polarizability_order() == 0:
+        raise SpectreRuntimeError("The LoProp data has no polarizabilities.")
+    polarizabilities = numpy.array(data.polarizabilities)
+    if data.get_polarizability_order() == 1:
+        return polarizabilities[:, 0]
+    return polarizabilities[:, [0, 3, 5]].mean(axis=1)  # xx, yy and zz
+
+
+def workspace_molecule_names(workspace, name):
+    """ Returns the names of the molecules of a species in a workspace
+
+        :param workspace: the workspace
+        :type workspace: spectre.workspace.Workspace
+        :param name: the name of the species
+        :type name: str
+        :rtype: list[str]
+    """
+    names = set(workspace.archive.directories())
+    if os.path.isdir(workspace.root):
+        names.update(entry for entry in os.listdir(workspace.root) if os.path.isdir(workspace.path(entry)))
+    suffix = "_{0:s}".format(name)
+    return sorted(entry for entry in names if entry.endswith(suffix) and entry[:-len(suffix)].isdigit())
+
+
+def read_training_data(workspace, name):
+    """ Reads the molecules of a species with LoProp results from a workspace
+
+        :param workspace: the workspace
+        :type workspace: spectre.workspace.Workspace
+        :param name: the name of the species
+        :type name: str
+        :return: the molecules and their atomic charges and isotropic polarizabilities (molecules x atoms)
+        :rtype: tuple[list[Molecule], numpy.ndarray, numpy.ndarray]
+    """
+    molecules = []
+    charges = []
+    polarizabilities = []
+    for molecule_name in workspace_molecule_names(workspace, name):
+        xyz_filename = "{0:s}.xyz".format(molecule_name)
+        loprop_filename = "{0:s}_dalton_loprop.loprop".format(molecule_name)
+        if not workspace.exists(molecule_name, xyz_filename) or not workspace.exists(molecule_name, loprop_filename):
+            continue
+
+        with workspace.open(molecule_name, xyz_filename) as xyz_file:
+            molecule = read_xyz_molecule(xyz_file)
+        with workspace.open(molecule_name, loprop_filename) as loprop_file:
+            data = spectre.loprop.read_loprop_data(loprop_file)
+        molecules.append(molecule)
+        charges.append(numpy.array(data.multipoles[0])[:, 0])
+        polarizabilities.append(isotropic_polarizabilities(data))
+
+    if len(molecules) == 0:
+        raise SpectreRuntimeError("No LoProp results of '{0:s}' found in '{1:s}'.".format(name, workspace.root))
+    return molecules, numpy.array(charges), numpy.array(polarizabilities)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Trains a kernel ridge regression model of atomic charges and polarizabilities from the LoProp calculations of a SPECTRE workspace.")
+    ap.add_argument("workspace", metavar="WORKSPACE", help="Directory of an earlier SPECTRE calculation.")
+    ap.add_argument("name", metavar="NAME", help="Name of the species (residue) to train a model of.")
+    ap.add_argument("-o", "--output", default=None, metavar="FILE", help="The model file. Default is NAME_krr.npz.")
+    ap.add_argument("--sigma", default=spectre.ml.krr.DEFAULT_SIGMA, type=float, help="Width of the kernel. Default is %(default)s.")
+    ap.add_argument("--regularization", default=spectre.ml.krr.DEFAULT_REGULARIZATION, type=float, help="Regularization of the kernel. Default is %(default)s.")
+    ap.add_argument("--num-centers", default=spectre.ml.krr.DEFAULT_NUM_CENTERS, type=int, help="Number of radial functions per element. Default is %(default)s.")
+    ap.add_argument("--width", default=spectre.ml.krr.DEFAULT_WIDTH, type=float, help="Width (in Angstrom) of the radial functions. Default is %(default)s.")
+    ap.add_argument("--cut-distance", default=spectre.ml.krr.DEFAULT_CUT_DISTANCE, type=float, help="Cutoff distance (in Angstrom) of the radial functions. Default is %(default)s.")
+    ap.add_argument("--max-molecules", default=0, type=int, help="Largest number of training molecules. Zero uses all molecules. Default is %(default)s.")
+    args = ap.parse_args(argv)
+
+    molecules, charges, polarizabilities = read_training_data(Workspace(args.workspace), args.name)
+    if args.max_molecules > 0:
+        molecules = molecules[:args.max_molecules]
+        charges = charges[:args.max_molecules]
+        polarizabilities = polarizabilities[:args.max_molecules]
+
+    model = spectre.ml.krr.train_model(molecules, charges, polarizabilities, args.sigma, args.regularization,
+                                       args.num_centers, args.width, args.cut_distance)
+    output = args.output
+    if output is None:
+        output = "{0:s}{1:s}".format(args.name, spectre.ml.krr.FILE_SUFFIX)
+    model.save(output)
+
+    predicted = spectre.ml.krr.predict_atomic_values(molecules, model)
+    print("trained on {0:d} molecules ({1:d} atoms)".format(len(molecules), model.get_num_training_atoms()))
+    print("training MAE charges         : {0:.6f}".format(numpy.abs(predicted[0] - charges.ravel()).mean()))
+    print("training MAE polarizabilities: {0:.6f}".format(numpy.abs(predicted[1] - polarizabilities.ravel()).mean()))
+    print("model written to '{0:s}'".format(output))
+
+
+if __name__ == "__main__":
+    main()
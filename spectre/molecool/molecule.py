@@ -1,12 +1,12 @@
 """ A molecule """
 
-import copy
 import numpy
 
 #import atom
 from .atom import Atom
 from .bond import Bond
 from .angle import Angle
+from .util import MASSES, VDWRADII, COVALENTRADII, COORDINATION, Z2LABEL
 
 __has_openbabel__ = False
 try:
@@ -17,6 +17,65 @@ else:
     __has_openbabel__ = True
 
 
+def bonded_pairs(coordinates, radii, threshold):
+    """ Finds all pairs of atoms closer than the sum of their covalent radii and a threshold
+
+        The atoms are sorted into a grid of cubic cells with an edge
+        equal to the longest possible bond. Each atom is then only
+        compared (vectorized) to the atoms of the 27 cells around it.
+
+        :param coordinates: coordinates of the atoms in Angstrom
+        :type coordinates: numpy.ndarray
+        :param radii: covalent radii of the atoms in Angstrom
+        :type radii: numpy.ndarray
+        :param threshold: added to the sum of the covalent radii
+        :type threshold: float
+        :returns: pairs (i, j) with i > j sorted by i and then j
+        :rtype: numpy.ndarray
+    """
+    n_atoms = len(coordinates)
+    if n_atoms < 2:
+        return numpy.zeros((0, 2), dtype=int)
+
+    cell_size = 2.0 * numpy.max(radii) + threshold
+    cells = numpy.floor((coordinates - coordinates.min(axis=0)) / cell_size).astype(numpy.int64)
+    dims = cells.max(axis=0) + 1
+
+    # atoms sorted by cell and the first atom and number of atoms of each occupied cell
+    keys = (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+    order = numpy.argsort(keys, kind='stable')
+    occupied, starts, counts = numpy.unique(keys[order], return_index=True, return_counts=True)
+
+    atom_ids = numpy.arange(n_atoms)
+    pairs = []
+    for offset in numpy.ndindex(3, 3, 3):
+        neighbours = cells + numpy.array(offset) - 1
+        valid = numpy.all((neighbours >= 0) & (neighbours < dims), axis=1)
+        neighbour_keys = (neighbours[:, 0] * dims[1] + neighbours[:, 1]) * dims[2] + neighbours[:, 2]
+        positions = numpy.minimum(numpy.searchsorted(occupied, neighbour_keys), len(occupied) - 1)
+        valid &= occupied[positions] == neighbour_keys
+        if not numpy.any(valid):
+            continue
+
+        # every atom is paired with all atoms of its neighbouring cell
+        cell_counts = counts[positions[valid]]
+        first = numpy.repeat(atom_ids[valid], cell_counts)
+        within = numpy.arange(len(first)) - numpy.repeat(numpy.cumsum(cell_counts) - cell_counts, cell_counts)
+        second = order[numpy.repeat(starts[positions[valid]], cell_counts) + within]
+
+        keep = first > second
+        first, second = first[keep], second[keep]
+        dr = coordinates[first] - coordinates[second]
+        bond_lengths = radii[first] + radii[second] + threshold
+        bonded = numpy.einsum('ij,ij->i', dr, dr) < bond_lengths**2
+        pairs.append(numpy.column_stack([first[bonded], second[bonded]]))
+
+    if len(pairs) == 0:
+        return numpy.zeros((0, 2), dtype=int)
+    pairs = numpy.concatenate(pairs)
+    return pairs[numpy.lexsort((pairs[:, 1], pairs[:, 0]))]
+
+
 class BaseMolecule(object):
     """ A molecule
 
@@ -219,6 +278,14 @@ class BaseMolecule(object):
         raise NotImplementedError # pragma: no cover
 
 
+    def get_nuclear_charges(self):
+        """ Returns a numpy array with the nuclear charges of all atoms of the molecule
+
+            :rtype: numpy.ndarray
+        """
+        return numpy.array([_atom.get_nuclear_charge() for _atom in self.get_atoms()], dtype=int)
+
+
     def get_center_of_mass(self):
         """ Calculates the center of mass in units of Angstrom """
         mass = 0.0
@@ -288,6 +355,86 @@ class BaseMolecule(object):
         raise NotImplementedError # pragma: no cover
 
 
+def _atom_property(field, to_python=None):
+    """ Returns a property of an :class:`AtomView` stored in an array of its molecule
+
+        :param field: the name of the array of the molecule
+        :type field: str
+        :param to_python: converts the element of the array when read
+    """
+    def fget(self):
+        value = getattr(self._molecule, field)[self._index]
+        if to_python is not None:
+            return to_python(value)
+        return value
+
+    def fset(self, value):
+        getattr(self._molecule, field)[self._index] = value
+
+    return property(fget, fset)
+
+
+class AtomView(Atom):
+    """ An atom of a :class:`Molecule`
+
+        The atom does not hold any data but reads and writes the arrays
+        of the molecule. Changing the atom therefore changes the
+        molecule and :meth:`get_coordinate` returns a view of the
+        coordinates of the molecule. Copies of the atom (through
+        :func:`copy.deepcopy`) are ordinary atoms.
+    """
+    _z = _atom_property('_nuclear_charges', int)
+    _c = _atom_property('_coordinates')
+    _mass = _atom_property('_masses', float)
+    _idx = _atom_property('_indices', int)
+    _fcharge = _atom_property('_formal_charges', int)
+    _vdw_radius = _atom_property('_vdw_radii', float)
+    _cov_radius = _atom_property('_covalent_radii', float)
+    _coordination = _atom_property('_coordinations', int)
+    _hybridization = _atom_property('_hybridizations', int)
+
+    def __init__(self, molecule, index):
+        """ Initializes a view of an atom of a molecule
+
+            :param molecule: the molecule
+            :type molecule: Molecule
+            :param index: the position of the atom in the molecule
+            :type index: int
+        """
+        self._molecule = molecule
+        self._index = index
+
+
+    @property
+    def _label(self):
+        return Z2LABEL[self._z]
+
+
+    def __deepcopy__(self, memo):
+        return Atom(self._z,
+                    mass=self._mass,
+                    xyz=numpy.array(self._c),
+                    idx=self._idx,
+                    fcharge=self._fcharge,
+                    vwdradius=self._vdw_radius,
+                    covradius=self._cov_radius,
+                    coordination=self._coordination,
+                    hybridization=self._hybridization)
+
+
+def _element_properties(table, nuclear_charges):
+    """ Looks up a property of the elements of many atoms
+
+        :param table: the property of each element by nuclear charge
+        :type table: dict[int, float]
+        :param nuclear_charges: the nuclear charges of the atoms
+        :type nuclear_charges: numpy.ndarray
+        :rtype: numpy.ndarray
+    """
+    elements, inverse = numpy.unique(nuclear_charges, return_inverse=True)
+    return numpy.array([table[Z] for Z in elements], dtype=float)[inverse.ravel()]
+
+
 class Molecule(BaseMolecule):
     """ A molecule
 
@@ -295,23 +442,138 @@ class Molecule(BaseMolecule):
         extract or manipulate atoms.
 
         A library-free implementation of the Molecule class. The
-        goal is provide a solution (albeit it might be slow) that
-        does not depend on any third-party libraries.
+        goal is provide a solution that does not depend on any
+        third-party libraries.
+
+        The atoms are stored in contiguous numpy arrays (one for each
+        property of the atoms) which grow as atoms are added. Atoms
+        returned by the molecule are views (see :class:`AtomView`) of
+        these arrays and :meth:`get_coordinates` returns a view of the
+        coordinates which stays valid until atoms are added.
 
         Internally, all atomic coordinates are stored in Angstrom
         and this convention should be adhered to when attempting to
         update the coordinates.
     """
+    # the arrays of the atoms: name, type and shape of the properties of an atom
+    _fields = (('_nuclear_charges', int, ()),
+               ('_coordinates', float, (3,)),
+               ('_masses', float, ()),
+               ('_indices', int, ()),
+               ('_formal_charges', int, ()),
+               ('_vdw_radii', float, ()),
+               ('_covalent_radii', float, ()),
+               ('_coordinations', int, ()),
+               ('_hybridizations', int, ()))
+
     def __init__(self):
         """ Initializes an empty molecule """
         BaseMolecule.__init__(self)
+        self._num_atoms = 0
+        for field, dtype, shape in self._fields:
+            setattr(self, field, numpy.zeros((0,) + shape, dtype=dtype))
+
+
+    @classmethod
+    def from_arrays(cls, nuclear_charges, coordinates, indices=None, formal_charges=None, name="", charge=0):
+        """ Creates a molecule from arrays of the properties of its atoms
+
+            The remaining properties of the atoms (masses, radii and
+            coordination numbers) are the defaults of the elements as
+            for :class:`Atom`.
+
+            :param nuclear_charges: the nuclear charges of the atoms
+            :type nuclear_charges: numpy.ndarray
+            :param coordinates: the coordinates of the atoms in Angstrom
+            :type coordinates: numpy.ndarray
+            :param indices: the atom indices. Default is -1 for all atoms.
+            :type indices: numpy.ndarray
+            :param formal_charges: the formal charges of the atoms. Default is 0.
+            :type formal_charges: numpy.ndarray
+            :param name: the name of the molecule
+            :type name: str
+            :param charge: the integer charge of the molecule
+            :type charge: int
+            :rtype: Molecule
+        """
+        nuclear_charges = numpy.asarray(nuclear_charges, dtype=int).reshape(-1)
+        n_atoms = len(nuclear_charges)
+        coordinates = numpy.asarray(coordinates, dtype=float)
+        if coordinates.shape != (n_atoms, 3):
+            raise ValueError("Expected coordinates of shape ({0:d}, 3) but got {1}".format(n_atoms, coordinates.shape))
+        assert numpy.all(nuclear_charges > 0), "Nuclear charge of atom must be greater than zero."
+        if indices is None:
+            indices = numpy.full(n_atoms, -1)
+        if formal_charges is None:
+            formal_charges = numpy.zeros(n_atoms, dtype=int)
+
+        mol = cls()
+        mol.set_name(name)
+        mol.set_charge(charge)
+        mol._append({'_nuclear_charges': nuclear_charges,
+                     '_coordinates': coordinates,
+                     '_masses': _element_properties(MASSES, nuclear_charges),
+                     '_indices': indices,
+                     '_formal_charges': formal_charges,
+                     '_vdw_radii': _element_properties(VDWRADII, nuclear_charges),
+                     '_covalent_radii': _element_properties(COVALENTRADII, nuclear_charges),
+                     '_coordinations': _element_properties(COORDINATION, nuclear_charges),
+                     '_hybridizations': numpy.zeros(n_atoms, dtype=int)})
+        return mol
+
+
+    def _append(self, values):
+        """ Appends atoms to the arrays of the molecule
+
+            The arrays grow geometrically so adding atoms one at a time
+            takes amortized constant time.
+
+            :param values: the properties of the new atoms by array name
+            :type values: dict[str, numpy.ndarray]
+        """
+        n_new = len(values['_nuclear_charges'])
+        n_atoms = self._num_atoms + n_new
+        capacity = len(self._nuclear_charges)
+        if n_atoms > capacity:
+            capacity = max(n_atoms, 2 * capacity, 8)
+            for field, dtype, shape in self._fields:
+                array = numpy.zeros((capacity,) + shape, dtype=dtype)
+                array[:self._num_atoms] = getattr(self, field)[:self._num_atoms]
+                setattr(self, field, array)
+
+        for field, dtype, shape in self._fields:
+            getattr(self, field)[self._num_atoms:n_atoms] = values[field]
+        self._num_atoms = n_atoms
 
 
     def add_atom(self, _atom):
-        """ Adds an atom to the molecule """
-        if not isinstance(_atom, Atom):
-            raise TypeError
-        self._atoms.append(copy.deepcopy(_atom))
+        """ Adds an atom to the molecule
+
+            The properties of the atom are copied to the molecule.
+        """
+        self.add_atoms(_atom)
+
+
+    def add_atoms(self, *args):
+        """ Adds multiple atoms to the molecule
+
+            The properties of the atoms are copied to the molecule.
+        """
+        for _atom in args:
+            if not isinstance(_atom, Atom):
+                raise TypeError
+        if len(args) == 0:
+            return
+
+        self._append({'_nuclear_charges': [_atom.get_nuclear_charge() for _atom in args],
+                      '_coordinates': [_atom.get_coordinate() for _atom in args],
+                      '_masses': [_atom.get_mass() for _atom in args],
+                      '_indices': [_atom.get_idx() for _atom in args],
+                      '_formal_charges': [_atom.get_formal_charge() for _atom in args],
+                      '_vdw_radii': [_atom.get_vdw_radius() for _atom in args],
+                      '_covalent_radii': [_atom.get_covalent_radius() for _atom in args],
+                      '_coordinations': [_atom.get_coordination() for _atom in args],
+                      '_hybridizations': [_atom.get_hybridization() for _atom in args]})
 
 
     def add_bond(self, _bond):
@@ -333,7 +595,7 @@ class Molecule(BaseMolecule):
 
            :rtype: int
         """
-        return len(self._atoms)
+        return self._num_atoms
 
 
     def get_atom(self, idx):
@@ -341,24 +603,53 @@ class Molecule(BaseMolecule):
 
             :param idx: the index (from 0 to get_num_atoms() -1)
             :type idx: int
-            :rtype: atom.Atom
+            :rtype: AtomView
         """
         n_atoms = self.get_num_atoms()
         if idx < 0:
             raise IndexError("argument idx to getAtom must be >= 0")
         if idx >= n_atoms:
             raise IndexError("argument idx to getAtom must be < {}".format(n_atoms))
-        return self._atoms[idx]
+        return AtomView(self, idx)
 
 
     def get_atoms(self):
         """ Returns all atoms (as an iterator) in the molecule
 
             :returns: all atoms as an iterator
-            :rtype: collections.Iterable[atom.Atom]
+            :rtype: collections.Iterable[AtomView]
+        """
+        for iat in range(self._num_atoms):
+            yield AtomView(self, iat)
+
+
+    def get_coordinates(self):
+        """ Returns the coordinates of the molecule
+
+            The coordinates are a view of the molecule so they must not be
+            changed in place. Use :meth:`set_coordinates` instead.
+
+            Note: coordinates are always in Angstrom.
+
+            :rtype: numpy.ndarray
+        """
+        return self._coordinates[:self._num_atoms]
+
+
+    def get_nuclear_charges(self):
+        """ Returns the nuclear charges of the atoms of the molecule (as a view)
+
+            :rtype: numpy.ndarray
         """
-        for _atom in self._atoms:
-            yield _atom
+        return self._nuclear_charges[:self._num_atoms]
+
+
+    def get_center_of_mass(self):
+        """ Calculates the center of mass in units of Angstrom """
+        masses = self._masses[:self._num_atoms]
+        mass = masses.sum()
+        assert mass != 0.0, "Total mass of molecule cannot be zero."
+        return masses.dot(self.get_coordinates()) / mass
 
 
     def get_bonds(self):
@@ -397,18 +688,16 @@ class Molecule(BaseMolecule):
         """ Attempts to percieve covalent bonds in the molecule
 
             It compares atom distances to covalent radii of the atoms.
-        """
-        #print("{}.{}".format(type(self).__name__, "percieve_bonds"))
-        for iat, atom1 in enumerate(self.get_atoms()):
-            for jat, atom2 in enumerate(self.get_atoms()):
-                if iat <= jat: continue
-                dr = atom2.get_coordinate() - atom1.get_coordinate()
-                R2 = dr.dot(dr)
 
-                dr_cov = atom1.get_covalent_radius() + atom2.get_covalent_radius() + self._bond_threshold
-                R2_cov = dr_cov**2
-                if R2 < R2_cov:
-                    yield Bond(id1=atom1.get_idx(), id2=atom2.get_idx())
+            Atoms are sorted into a grid of cells at least as large as
+            the longest possible bond so only atoms in neighbouring cells
+            are compared. Bonds are returned in the same order as when
+            comparing all pairs of atoms.
+        """
+        indices = self._indices[:self._num_atoms]
+        for iat, jat in bonded_pairs(self.get_coordinates(), self._covalent_radii[:self._num_atoms],
+                                     self._bond_threshold):
+            yield Bond(id1=int(indices[iat]), id2=int(indices[jat]))
 
 
     def set_coordinates(self, value):
@@ -419,11 +708,9 @@ class Molecule(BaseMolecule):
         """
         if not isinstance(value, numpy.ndarray):
             raise TypeError("Argument 'value' must be of type numpy array")
-        (n, ) = numpy.shape(value)
-        if n != self.get_num_atoms():
+        if numpy.shape(value) != (self.get_num_atoms(), 3):
             raise ValueError("Argument 'value' has the wrong number of atoms")
-        for iat, _atom in enumerate(self.get_atoms()):
-            _atom.set_coordinate(value[iat])
+        self._coordinates[:self._num_atoms] = value
 
 
     def find_children(self, other_atom):
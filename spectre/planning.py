@@ -0,0 +1,153 @@
+""" Estimates of the resources of a calculation before it is submitted
+
+The jobs of each stage are enumerated from the molecules alone so a
+plan never writes to the workspace. For each job the number of basis
+functions is estimated from the atoms and the basis set (see
+:mod:`spectre.costs`) and from it
+
+  - the cost in core-seconds with the (calibrated) cost model and
+  - the memory as a number of N x N matrices DALTON keeps in memory.
+
+The size of embedding potential (.pot) files is estimated from the
+number of sites and the number of values written for each site.
+"""
+from spectre.costs import estimate_basis_functions, longest_processing_time
+
+# memory (in MB) of a DALTON job independent of the size of the molecule
+BASE_MEMORY = 256.0
+
+# number of N x N matrices held in memory by each type of job and the
+# additional matrices (trial and response vectors) for each excited state
+MEMORY_MATRICES = {"loprop": 40,
+                   "pde_monomer": 20,
+                   "pde_dimer": 30,
+                   "peex": 30,
+                   "pdeex": 40}
+DEFAULT_MEMORY_MATRICES = 30
+MEMORY_MATRICES_PER_STATE = 6
+
+# characters written to a .pot file for the coordinates of a site, a
+# single value and a single entry of an exclusion list
+SITE_BYTES = 64
+VALUE_BYTES = 16
+EXCLUSION_BYTES = 6
+
+
+def estimate_job_memory(job_type, num_basis_functions, num_excited_states=0):
+    """ Estimates the memory of a job
+
+        :param job_type: the type of job
+        :type job_type: str
+        :param num_basis_functions: the number of basis functions
+        :type num_basis_functions: int
+        :param num_excited_states: the number of excited states computed by the job
+        :type num_excited_states: int
+        :return: the memory in MB
+        :rtype: float
+    """
+    matrices = MEMORY_MATRICES.get(job_type, DEFAULT_MEMORY_MATRICES) + MEMORY_MATRICES_PER_STATE * num_excited_states
+    return BASE_MEMORY + matrices * 8.0 * num_basis_functions**2 / 1024**2
+
+
+def estimate_potential_size(num_sites, multipole_order, polarizability_order, num_exclusions=0):
+    """ Estimates the size of an embedding potential file
+
+        :param num_sites: the number of sites of the potential
+        :type num_sites: int
+        :param multipole_order: the highest order of the multipoles
+        :type multipole_order: int
+        :param polarizability_order: 0 for no polarizabilities, 1 for isotropic and 2 for anisotropic polarizabilities
+        :type polarizability_order: int
+        :param num_exclusions: the total length of the exclusion lists of the sites
+        :type num_exclusions: int
+        :return: the size in bytes
+        :rtype: int
+    """
+    num_values = sum((k + 1) * (k + 2) // 2 for k in range(multipole_order + 1))
+    if polarizability_order > 0:
+        num_values += 6  # polarizabilities are always written as a full tensor
+    site_bytes = SITE_BYTES + num_values * VALUE_BYTES
+    return num_sites * site_bytes + num_exclusions * EXCLUSION_BYTES
+
+
+class StagePlan(object):
+    """ The jobs of a stage of a calculation and their estimated resources """
+
+    def __init__(self, name, job_type, basis, cost_model, cpus_per_job=1, num_excited_states=0):
+        """ Initializes the stage
+
+            :param name: the name of the stage shown in reports
+            :type name: str
+            :param job_type: the type of the jobs (see :class:`spectre.costs.CostModel`)
+            :type job_type: str
+            :param basis: the basis set of the jobs
+            :type basis: str
+            :param cost_model: model used to estimate the cost of the jobs
+            :type cost_model: spectre.costs.CostModel
+            :param cpus_per_job: number of cores per job
+            :type cpus_per_job: int
+            :param num_excited_states: the number of excited states computed by each job
+            :type num_excited_states: int
+        """
+        self.name = name
+        self.job_type = job_type
+        self.basis = basis
+        self.cpus_per_job = max(1, cpus_per_job)
+        self.num_excited_states = num_excited_states
+        self.num_done = 0
+        self.basis_functions = []
+        self._cost_model = cost_model
+
+    def add(self, molecule, done=False):
+        """ Adds the job of a molecule to the stage
+
+            :param molecule: the molecule of the job
+            :type molecule: Molecule
+            :param done: whether the results of the job are available already. Such jobs are not estimated.
+            :type done: bool
+        """
+        if done:
+            self.num_done += 1
+            return
+        self.basis_functions.append(estimate_basis_functions(molecule, self.basis))
+
+    def get_num_jobs(self):
+        """ Returns the number of jobs left to compute """
+        return len(self.basis_functions)
+
+    def get_max_basis_functions(self):
+        """ Returns the largest number of basis functions of a job """
+        return max(self.basis_functions, default=0)
+
+    def get_durations(self):
+        """ Returns the estimated duration of each job in seconds
+
+            :rtype: list[float]
+        """
+        return [self._cost_model.estimate(self.job_type, n) / self.cpus_per_job for n in self.basis_functions]
+
+    def get_core_hours(self):
+        """ Returns the estimated core-hours of all jobs
+
+            :rtype: float
+        """
+        return sum(self._cost_model.estimate(self.job_type, n) for n in self.basis_functions) / 3600.0
+
+    def get_max_memory(self):
+        """ Returns the estimated memory (in MB) of the largest job
+
+            :rtype: float
+        """
+        if len(self.basis_functions) == 0:
+            return 0.0
+        return estimate_job_memory(self.job_type, self.get_max_basis_functions(), self.num_excited_states)
+
+    def get_makespan(self, num_slots):
+        """ Returns the estimated time (in hours) to compute all jobs
+
+            :param num_slots: the number of jobs that can run at the same time
+            :type num_slots: int
+            :rtype: float
+        """
+        _, _, makespan = longest_processing_time(self.get_durations(), num_slots)
+        return makespan / 3600.0
@@ -0,0 +1,212 @@
+""" Timed spans of the steps of a calculation
+
+A span measures a step of a calculation: its wall time, the CPU time of
+the process (and of finished child processes such as DALTON jobs run
+locally), the peak resident memory of the process at its end and any
+number of item counts. Spans started while another span of the same
+thread is open are nested in it.
+
+Spans are only recorded once the profiler is enabled so they can stay
+in the code at (almost) no cost. Spans opened in worker processes (for
+instance by the pool computing couplings) are not recorded.
+
+The spans are written as a Chrome trace (chrome://tracing or Perfetto)
+and summarized as a table of the total time of each (nested) step.
+"""
+import contextlib
+import json
+import os
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # not available on all platforms
+    resource = None
+
+
+def cpu_times():
+    """ Returns the CPU time (in seconds) of the process and of its finished child processes
+
+        :rtype: tuple[float, float]
+    """
+    if resource is None:
+        return time.process_time(), 0.0
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime, children.ru_utime + children.ru_stime
+
+
+def peak_rss():
+    """ Returns the peak resident memory (in MB) of the process so far
+
+        :rtype: float
+    """
+    if resource is None:
+        return 0.0
+    # kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+class Span(object):
+    """ A timed step of a calculation """
+
+    def __init__(self, name, path, thread_id, counts):
+        self.name = name
+        self.path = path
+        self.thread_id = thread_id
+        self.counts = dict(counts)
+        self.start = 0.0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.child_cpu = 0.0
+        self.peak_rss = 0.0
+
+    def count(self, key, n=1):
+        """ Adds to an item count of the span
+
+            :param key: the name of the items
+            :type key: str
+            :param n: the number of items
+            :type n: int
+        """
+        self.counts[key] = self.counts.get(key, 0) + n
+
+
+class _NullSpan(object):
+    """ Span returned while profiling is disabled """
+
+    def count(self, key, n=1):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Profiler(object):
+    """ Records nested spans of all threads """
+
+    def __init__(self):
+        self.enabled = False
+        self._spans = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._origin = time.perf_counter()
+
+    def enable(self):
+        """ Starts recording spans """
+        self.enabled = True
+
+    @contextlib.contextmanager
+    def span(self, name, **counts):
+        """ Measures the enclosed step
+
+            :param name: name of the step
+            :type name: str
+            :param counts: initial item counts of the step
+            :return: the span. Items are counted with :meth:`Span.count`.
+        """
+        if not self.enabled:
+            yield _NULL_SPAN
+            return
+
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        path = name
+        if len(stack) > 0:
+            path = "{0:s}/{1:s}".format(stack[-1].path, name)
+
+        span = Span(name, path, threading.get_ident(), counts)
+        stack.append(span)
+        cpu, child_cpu = cpu_times()
+        span.start = time.perf_counter()
+        try:
+            yield span
+        finally:
+            span.wall = time.perf_counter() - span.start
+            end_cpu, end_child_cpu = cpu_times()
+            span.cpu = end_cpu - cpu
+            span.child_cpu = end_child_cpu - child_cpu
+            span.peak_rss = peak_rss()
+            stack.pop()
+            with self._lock:
+                self._spans.append(span)
+
+    def get_spans(self):
+        """ Returns the finished spans in the order they finished
+
+            :rtype: list[Span]
+        """
+        with self._lock:
+            return list(self._spans)
+
+    def trace_events(self):
+        """ Returns the spans as events of a Chrome trace
+
+            :rtype: list[dict]
+        """
+        events = []
+        for span in self.get_spans():
+            span_args = {"cpu [s]": span.cpu, "child cpu [s]": span.child_cpu, "peak rss [MB]": span.peak_rss}
+            span_args.update(span.counts)
+            events.append({"name": span.name,
+                           "cat": span.path.split("/")[0],
+                           "ph": "X",
+                           "ts": (span.start - self._origin) * 1.0e6,
+                           "dur": span.wall * 1.0e6,
+                           "pid": os.getpid(),
+                           "tid": span.thread_id,
+                           "args": span_args})
+        return events
+
+    def write_trace(self, filename):
+        """ Writes the spans as a Chrome trace (JSON)
+
+            :param filename: the trace file
+            :type filename: str
+        """
+        with open(filename, 'w') as f:
+            json.dump({"traceEvents": self.trace_events(), "displayTimeUnit": "ms"}, f)
+
+    def summary(self):
+        """ Returns the totals of the spans of each (nested) step ordered by first start
+
+            :return: path, calls, wall time, CPU time, child CPU time, peak RSS and item counts of each step
+            :rtype: list[tuple[str, int, float, float, float, float, dict[str, int]]]
+        """
+        totals = {}
+        first_start = {}
+        for span in self.get_spans():
+            calls, wall, cpu, child_cpu, rss, counts = totals.get(span.path, (0, 0.0, 0.0, 0.0, 0.0, {}))
+            for key, n in span.counts.items():
+                counts[key] = counts.get(key, 0) + n
+            totals[span.path] = (calls + 1, wall + span.wall, cpu + span.cpu, child_cpu + span.child_cpu,
+                                 max(rss, span.peak_rss), counts)
+            first_start[span.path] = min(first_start.get(span.path, span.start), span.start)
+
+        return [(path,) + totals[path] for path in sorted(totals, key=lambda p: (first_start[p], p))]
+
+    def format_summary(self):
+        """ Returns the summary as a table
+
+            :rtype: str
+        """
+        lines = ["{0:<44s} {1:>7s} {2:>10s} {3:>10s} {4:>10s} {5:>9s}  {6:s}".format(
+            "step", "calls", "wall [s]", "cpu [s]", "child [s]", "rss [MB]", "items")]
+        for path, calls, wall, cpu, child_cpu, rss, counts in self.summary():
+            depth = path.count("/")
+            name = "  " * depth + path.rsplit("/", 1)[-1]
+            items = ", ".join("{0:s}={1}".format(key, counts[key]) for key in sorted(counts))
+            lines.append("{0:<44s} {1:>7d} {2:>10.2f} {3:>10.2f} {4:>10.2f} {5:>9.1f}  {6:s}".format(
+                name, calls, wall, cpu, child_cpu, rss, items))
+        return "\n".join(lines)
+
+
+# the profiler of the calculation
+PROFILER = Profiler()
+
+
+def span(name, **counts):
+    """ Measures the enclosed step with the profiler of the calculation (see :meth:`Profiler.span`) """
+    return PROFILER.span(name, **counts)
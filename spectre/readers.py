@@ -5,14 +5,23 @@ import os.path
 
 from spectre.errors import SpectrePEEXFileNotFoundError, SpectreExcitedStateValueError
 
+# lines of DALTON log files of calculations that stopped with an error
+DALTON_ERROR_MARKERS = ("SEVERE ERROR",
+                        "PROGRAM WILL BE ABORTED",
+                        "INSUFFICIENT MEMORY",
+                        "MEMGET ERROR",
+                        "Segmentation fault")
 
-def get_chromophore_peex_data(filename, coupling_with_moments):
+
+def get_chromophore_peex_data(filename, coupling_with_moments, peex_file=None):
     """ Parses chromophore data from a DALTON log file
 
-        :param filename: the file to read
+        :param filename: the file to read (without the .out extension)
         :type filename: str
         :param coupling_with_moments: whether or not to read the coupling data
         :type coupling_with_moments: bool
+        :param peex_file: the opened log file. If given, it is read (and closed) instead of the file on disk.
+        :type peex_file: io.IOBase
         :raises: if file is not found SpectrePEEXFileNotFoundError is twrown.
         :return: a lot of data
         :rtype: tuple[list[float], list[list[float]], dict, int]
@@ -35,9 +44,12 @@ def get_chromophore_peex_data(filename, coupling_with_moments):
     parsing_eex_data = False
     parsing_tr_data = False
     peex_filename = "{0:s}.out".format(filename)
-    if not os.path.exists(peex_filename):
-        raise SpectrePEEXFileNotFoundError("Could not find the excited state file {}".format(peex_filename))
-    with open(peex_filename, "r") as peex_file:
+    if peex_file is None:
+        if not os.path.exists(peex_filename):
+            raise SpectrePEEXFileNotFoundError("Could not find the excited state file {}".format(peex_filename))
+        peex_file = open(peex_filename, "r")
+
+    with peex_file:
         line = peex_file.readline()
 
         while line:
@@ -123,3 +135,63 @@ def get_chromophore_peex_data(filename, coupling_with_moments):
     return energies, transition_dipoles, tr_moments, mom_order
 
 
+def get_dalton_wall_time(filename):
+    """ Parses the total wall time of a DALTON calculation from its log file
+
+        DALTON reports the time as, for instance,
+
+          Total wall time used in DALTON:   0.87 seconds
+          Total wall time used in DALTON:   1 hour  2 minutes  3 seconds
+
+        :param filename: the log file to read
+        :type filename: str
+        :return: the wall time in seconds or None if it was not found
+        :rtype: float
+    """
+    if not os.path.exists(filename):
+        return None
+
+    units = {"second": 1.0, "minute": 60.0, "hour": 3600.0, "day": 86400.0}
+    wall_time = None
+    with open(filename, "r") as log_file:
+        for line in log_file:
+            if "Total wall time used in DALTON:" not in line:
+                continue
+
+            wall_time = 0.0
+            for value, unit in re.findall(r'([0-9.]+)\s+(second|minute|hour|day)s?', line.split(":", 1)[1]):
+                wall_time += float(value) * units[unit]
+
+    return wall_time
+
+
+def get_dalton_log_error(filename, log_file=None):
+    """ Checks whether a DALTON calculation finished normally from its log file
+
+        A calculation finished normally if DALTON reports its total wall
+        time and the log file does not contain any error markers.
+
+        :param filename: the log file to read
+        :type filename: str
+        :param log_file: the opened log file. If given, it is read (and closed) instead of the file on disk.
+        :type log_file: io.IOBase
+        :return: None if the calculation finished normally. Otherwise, why it did not.
+        :rtype: str
+    """
+    if log_file is None:
+        if not os.path.exists(filename):
+            return "missing log file"
+        log_file = open(filename, "r")
+
+    finished = False
+    with log_file:
+        for line in log_file:
+            for marker in DALTON_ERROR_MARKERS:
+                if marker in line:
+                    return "error in log file: {0:s}".format(line.strip())
+            if "Total wall time used in DALTON:" in line:
+                finished = True
+
+    if not finished:
+        return "incomplete log file"
+    return None
@@ -0,0 +1,186 @@
+""" Dependency-driven scheduling of the SPECTRE workflow
+
+The workflow is described as a graph of nodes where a node becomes
+runnable as soon as all the nodes it depends on are done. There are
+two kinds of nodes:
+
+  - tasks, which are Python callables executed by a pool of threads, and
+  - job nodes, which build a list of external (CalcIt) jobs that are
+    executed through a dispatch function.
+
+Job nodes that are ready when a batch is dispatched are collected and
+handed to the dispatch function together, so many small job lists are
+executed as one batch while the Python tasks keep running. Up to
+max_batches batches run at the same time, so job nodes that become
+ready while a batch is running do not wait for it to finish.
+
+All ready nodes are taken from a single global ready queue. Nodes can be
+added to the graph while it is running, for instance by a task that
+discovers more work.
+"""
+import collections
+import concurrent.futures
+import threading
+
+
+class SpectreSchedulerError(RuntimeError):
+    pass
+
+
+class Node(object):
+    """ A node in the task graph """
+    def __init__(self, name, func, dependencies, is_job=False, batch_key=None):
+        self.name = name
+        self.func = func
+        self.dependencies = list(dependencies)
+        self.is_job = is_job
+        self.batch_key = batch_key
+        self.result = None
+
+
+class TaskGraph(object):
+    """ A graph of tasks and job nodes executed in dependency order """
+
+    def __init__(self):
+        self._nodes = collections.OrderedDict()
+        self._lock = threading.RLock()
+        self._new_nodes = []
+
+    def add_task(self, name, func, dependencies=()):
+        """ Adds a Python task to the graph
+
+            :param name: unique name of the task
+            :type name: str
+            :param func: the callable to execute. It takes no arguments.
+            :param dependencies: names of the nodes that must be done before the task can run
+            :type dependencies: list[str]
+            :return: the name of the task
+            :rtype: str
+        """
+        return self._add(Node(name, func, dependencies))
+
+    def add_jobs(self, name, build_jobs, dependencies=(), batch_key=None):
+        """ Adds a job node to the graph
+
+            :param name: unique name of the node
+            :type name: str
+            :param build_jobs: callable that returns the list of jobs to execute when the node is ready
+            :param dependencies: names of the nodes that must be done before the jobs can be built
+            :type dependencies: list[str]
+            :param batch_key: only job nodes with the same batch key are dispatched together
+            :return: the name of the node
+            :rtype: str
+        """
+        return self._add(Node(name, build_jobs, dependencies, is_job=True, batch_key=batch_key))
+
+    def get_result(self, name):
+        """ Returns the value returned by a task (or the jobs of a job node) """
+        return self._nodes[name].result
+
+    def __contains__(self, name):
+        return name in self._nodes
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def _add(self, node):
+        with self._lock:
+            if node.name in self._nodes:
+                raise SpectreSchedulerError("Node '{0:s}' already exists.".format(node.name))
+            self._nodes[node.name] = node
+            self._new_nodes.append(node)
+        return node.name
+
+    def run(self, dispatch, num_workers=1, max_batches=1):
+        """ Runs all nodes in the graph
+
+            :param dispatch: callable executing a list of jobs given as (batch_key, jobs). It is called from several threads at once if max_batches is larger than one.
+            :param num_workers: the number of threads executing Python tasks
+            :type num_workers: int
+            :param max_batches: the number of batches of jobs dispatched at the same time
+            :type max_batches: int
+
+            The first exception raised by a node is raised again at once.
+            Nothing more is dispatched, queued nodes are cancelled and
+            nodes that are running (in their threads) are not waited for.
+        """
+        waiting = {}  # name -> number of unfinished dependencies
+        dependents = collections.defaultdict(list)
+        done = set()
+        ready = collections.deque()  # the global ready queue
+        pending_jobs = collections.OrderedDict()  # job nodes with built jobs waiting for dispatch
+        running = {}  # future -> (kind, payload)
+
+        task_pool = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, num_workers))
+        max_batches = max(1, max_batches)
+        job_pool = concurrent.futures.ThreadPoolExecutor(max_workers=max_batches)
+        running_batches = 0
+
+        def register_new_nodes():
+            with self._lock:
+                new_nodes, self._new_nodes = self._new_nodes, []
+            for node in new_nodes:
+                for dependency in node.dependencies:
+                    if dependency not in self._nodes:
+                        raise SpectreSchedulerError("Node '{0:s}' depends on unknown node '{1:s}'.".format(node.name, dependency))
+                unfinished = [d for d in node.dependencies if d not in done]
+                waiting[node.name] = len(unfinished)
+                for dependency in unfinished:
+                    dependents[dependency].append(node.name)
+                if len(unfinished) == 0:
+                    ready.append(node.name)
+
+        def finish(name):
+            done.add(name)
+            for dependent in dependents.pop(name, []):
+                waiting[dependent] -= 1
+                if waiting[dependent] == 0:
+                    ready.append(dependent)
+
+        completed = False
+        try:
+            register_new_nodes()
+            while len(done) < len(self._nodes):
+                while ready:
+                    name = ready.popleft()
+                    node = self._nodes[name]
+                    running[task_pool.submit(node.func)] = ('task', name)
+
+                while running_batches < max_batches and len(pending_jobs) > 0:
+                    batch_key = self._nodes[next(iter(pending_jobs))].batch_key
+                    names = [n for n in pending_jobs if self._nodes[n].batch_key == batch_key]
+                    jobs = []
+                    for name in names:
+                        jobs.extend(pending_jobs.pop(name))
+                    running[job_pool.submit(dispatch, batch_key, jobs)] = ('batch', names)
+                    running_batches += 1
+
+                if len(running) == 0:
+                    unfinished = [n for n in self._nodes if n not in done]
+                    raise SpectreSchedulerError("Unable to schedule nodes: {0:s}".format(", ".join(unfinished)))
+
+                finished, _ = concurrent.futures.wait(list(running), return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in finished:
+                    kind, payload = running.pop(future)
+                    result = future.result()  # re-raises exceptions from the node
+                    if kind == 'batch':
+                        running_batches -= 1
+                        for name in payload:
+                            finish(name)
+                        continue
+
+                    node = self._nodes[payload]
+                    node.result = result
+                    if node.is_job:
+                        if result:
+                            pending_jobs[payload] = list(result)
+                        else:
+                            finish(payload)
+                    else:
+                        finish(payload)
+
+                register_new_nodes()
+            completed = True
+        finally:
+            task_pool.shutdown(wait=completed, cancel_futures=not completed)
+            job_pool.shutdown(wait=completed, cancel_futures=not completed)
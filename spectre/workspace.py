@@ -0,0 +1,292 @@
+""" Working directory of a SPECTRE calculation
+
+All files of a calculation live in a single base directory with one
+sub-directory per molecule, chromophore-fragment pair or shared PDE
+monomer. The workspace resolves the files in these directories by
+absolute path so stages never depend on (or change) the current
+directory and can run concurrently in threads.
+
+The only exception is the creation of CalcIt jobs which record the
+current directory as the directory the job runs in. This is done in
+:meth:`Workspace.job_directory` which serializes the change of
+directory with a lock.
+
+Finished directories are moved to the archive of the workspace
+(see :mod:`spectre.archive`), optionally by a background thread while
+the calculation continues. Files are read from the archive when they
+are not found on disk so directories are only extracted again when a
+stage needs to work in them.
+
+Generated input files are written through :meth:`Workspace.write_input`
+which records a digest of the data they are generated from in a
+manifest (see :mod:`spectre.manifest`). Files that are up to date are
+not written again and the remaining files are written by a pool of
+threads in the background until :meth:`Workspace.flush` is called.
+"""
+import concurrent.futures
+import contextlib
+import os
+import shutil
+import threading
+import zipfile
+
+from spectre.archive import WorkspaceArchive
+from spectre.hashing import file_digest
+from spectre.manifest import WorkspaceManifest
+
+ARCHIVE_FILENAME = "workspace.zip"
+MANIFEST_FILENAME = "manifest.json"
+
+# serializes changes of the current directory of the process
+WORK_DIR_LOCK = threading.RLock()
+
+
+def molecule_name(index, molecule):
+    """ Returns the name (and directory) of a molecule in the workspace
+
+        :param index: the (one-based) index of the molecule
+        :type index: int
+        :param molecule: the molecule
+        :type molecule: Molecule
+        :rtype: str
+    """
+    return "{0:04d}_{1:s}".format(index, molecule.get_name())
+
+
+class Workspace(object):
+    """ Resolves the files of a calculation by absolute path """
+
+    def __init__(self, root, num_threads=4):
+        """ Initializes the workspace
+
+            :param root: the base directory of the calculation. It is created when needed.
+            :type root: str
+            :param num_threads: number of threads writing input files
+            :type num_threads: int
+        """
+        self.root = os.path.abspath(root)
+        self.archive = WorkspaceArchive(self.path(ARCHIVE_FILENAME))
+        self.manifest = WorkspaceManifest(self.path(MANIFEST_FILENAME))
+        self._num_threads = max(1, num_threads)
+        self._writer = None
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self._packer = None
+        self._packing = []
+
+    def path(self, *parts):
+        """ Returns the absolute path of a file (or directory) relative to the base directory
+
+            :rtype: str
+        """
+        return os.path.join(self.root, *parts)
+
+    def directory(self, name):
+        """ Returns the absolute path of a sub-directory and creates it if needed
+
+            :param name: name of the sub-directory
+            :type name: str
+            :rtype: str
+        """
+        path = self.path(name)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def file(self, name, suffix):
+        """ Returns the absolute path of a file named after its sub-directory
+
+            For instance, file("0001_WAT", "_dalton_loprop.loprop") is
+            <root>/0001_WAT/0001_WAT_dalton_loprop.loprop
+
+            :param name: name of the sub-directory
+            :type name: str
+            :param suffix: what is added to the name to get the filename
+            :type suffix: str
+            :rtype: str
+        """
+        return self.path(name, "{0:s}{1:s}".format(name, suffix))
+
+    def exists(self, *parts):
+        """ Returns whether a file exists on disk or in the archive
+
+            :rtype: bool
+        """
+        return os.path.exists(self.path(*parts)) or "/".join(parts) in self.archive
+
+    def open(self, *parts, mode='r'):
+        """ Opens a file for reading from disk or, if not found there, from the archive
+
+            :param mode: 'r' for text and 'rb' for binary access
+            :type mode: str
+            :raises FileNotFoundError: if the file is found in neither place
+            :rtype: io.IOBase
+        """
+        try:
+            return open(self.path(*parts), mode)
+        except FileNotFoundError:  # not on disk (any longer)
+            return self.archive.open("/".join(parts), mode)
+
+    def unpack(self, name):
+        """ Extracts the archived files of a sub-directory
+
+            Files already on disk are kept. A zip file of the sub-directory
+            itself (from earlier versions) is extracted as well.
+
+            :param name: name of the sub-directory
+            :type name: str
+            :return: True if any files were extracted
+            :rtype: bool
+        """
+        extracted = False
+        legacy_archive = self.path(name + ".zip")
+        if zipfile.is_zipfile(legacy_archive):
+            with zipfile.ZipFile(legacy_archive) as zf:
+                zf.extractall(self.root)
+            os.remove(legacy_archive)  # the files are archived with the workspace from now on
+            extracted = True
+
+        for member in self.archive.directory_names(name):
+            filename = self.path(*member.split("/"))
+            if not os.path.exists(filename):
+                os.makedirs(os.path.dirname(filename), exist_ok=True)
+                with open(filename, 'wb') as f:
+                    f.write(self.archive.read(member))
+                extracted = True
+        return extracted
+
+    def write_input(self, name, filename, write, digest=None, materialize=True):
+        """ Writes a generated input file of a sub-directory unless it is up to date
+
+            If the digest of the data the file is generated from is given,
+            an up to date file is not written at all and other files are
+            written in the background (see :meth:`flush`). Otherwise, the
+            file is written to a temporary file first and only replaces the
+            file if the contents differ.
+
+            :param name: name of the sub-directory
+            :type name: str
+            :param filename: name of the file in the sub-directory
+            :type filename: str
+            :param write: function writing the file. It is called with the (absolute) filename.
+            :param digest: digest of the data the file is generated from
+            :type digest: str
+            :param materialize: whether the file must be on disk. If not, an up to date file in the archive is kept there.
+            :type materialize: bool
+            :return: the digest of the file
+            :rtype: str
+        """
+        member = "{0:s}/{1:s}".format(name, filename)
+        path = self.path(name, filename)
+
+        if digest is None:
+            self.directory(name)
+            temp_path = path + ".tmp"
+            write(temp_path)
+            digest = file_digest(temp_path)
+            if self.manifest.is_current(member, path, digest):
+                os.remove(temp_path)
+            else:
+                os.replace(temp_path, path)
+                self.manifest.record(member, path, digest)
+            return digest
+
+        if self.manifest.is_current(member, path, digest):
+            return digest
+        if not materialize and not os.path.exists(path) and self.manifest.get_digest(member) == digest \
+                and member in self.archive:
+            return digest
+
+        self.directory(name)
+
+        def write_file():
+            write(path)
+            self.manifest.record(member, path, digest)
+
+        with self._pending_lock:
+            if self._writer is None:
+                self._writer = concurrent.futures.ThreadPoolExecutor(max_workers=self._num_threads)
+            self._pending.append(self._writer.submit(write_file))
+        return digest
+
+    def flush(self):
+        """ Waits until all input files are written """
+        with self._pending_lock:
+            pending, self._pending = self._pending, []
+        for future in pending:
+            future.result()
+
+    def save(self):
+        """ Waits until all input files are written and saves the manifest """
+        self.flush()
+        self.manifest.save()
+
+    def pack(self, names, num_threads=1, background=False):
+        """ Moves sub-directories to the archive of the workspace
+
+            Files of a sub-directory replace earlier copies in the archive.
+            Files compress in parallel and the sub-directories are removed
+            once the archive is written. Sub-directories are packed one
+            call after the other.
+
+            :param names: names of the sub-directories. Nothing must be written to them any more.
+            :type names: list[str]
+            :param num_threads: number of threads compressing the files
+            :type num_threads: int
+            :param background: whether to return at once and pack the sub-directories in the background (see :meth:`wait_packing`)
+            :type background: bool
+        """
+        self.save()
+        with self._pending_lock:
+            if self._packer is None:
+                self._packer = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+            self._packing.append(self._packer.submit(self._pack, list(names), num_threads))
+        if not background:
+            self.wait_packing()
+
+    def wait_packing(self):
+        """ Waits until all sub-directories are packed """
+        with self._pending_lock:
+            packing, self._packing = self._packing, []
+        for future in packing:
+            future.result()
+
+    def _pack(self, names, num_threads):
+        names = [name for name in names if os.path.isdir(self.path(name))]
+        if len(names) == 0:
+            return
+
+        self.archive.update(self.root, names, num_threads)
+        for name in names:
+            shutil.rmtree(self.path(name))
+
+    @contextlib.contextmanager
+    def job_directory(self, name):
+        """ Changes to a sub-directory (created if needed) while a job is created
+
+            The current directory is shared by all threads so other threads
+            must not depend on it. It is restored afterwards. The input
+            files are written before the job is created.
+
+            :param name: name of the sub-directory
+            :type name: str
+        """
+        path = self.directory(name)
+        self.flush()
+        with change_directory(path):
+            yield path
+
+
+@contextlib.contextmanager
+def change_directory(path):
+    """ Changes to a directory while a job is created (see :meth:`Workspace.job_directory`)
+
+        :param path: the directory
+        :type path: str
+    """
+    with WORK_DIR_LOCK:
+        cwd = os.getcwd()
+        os.chdir(path)
+        try:
+            yield path
+        finally:
+            os.chdir(cwd)
@@ -0,0 +1,27 @@
+import numpy
+import pytest
+
+from spectre.molecool.molecule import Molecule
+
+
+def water(angle=1.8238, distance=0.96, shift=(0.0, 0.0, 0.0)):
+    """ Returns a water molecule (named WAT) in the xy-plane with the oxygen first
+
+        :param angle: the H-O-H angle in radians. Default is 104.5 degrees.
+        :type angle: float
+        :param distance: the O-H distance in Angstrom
+        :type distance: float
+        :param shift: added to the coordinates of all atoms
+        :type shift: tuple[float, float, float]
+        :rtype: Molecule
+    """
+    coordinates = numpy.array([[0.0, 0.0, 0.0],
+                               [distance, 0.0, 0.0],
+                               [distance * numpy.cos(angle), distance * numpy.sin(angle), 0.0]]) + shift
+    return Molecule.from_arrays([8, 1, 1], coordinates, indices=[0, 1, 2], name="WAT")
+
+
+@pytest.fixture
+def build_water():
+    """ Builds water molecules (see :func:`water`) """
+    return water
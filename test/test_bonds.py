@@ -0,0 +1,32 @@
+import numpy
+
+from spectre.molecool.bond import Bond
+from spectre.molecool.molecule import bonded_pairs
+
+
+def all_pairs(coordinates, radii, threshold):
+    pairs = []
+    for i in range(len(coordinates)):
+        for j in range(i):
+            dr = coordinates[i] - coordinates[j]
+            if dr.dot(dr) < (radii[i] + radii[j] + threshold)**2:
+                pairs.append((i, j))
+    return pairs
+
+
+def test_percieve_bonds_water(build_water):
+    assert list(build_water().percieve_bonds()) == [Bond(1, 0), Bond(2, 0)]
+
+
+def test_bonded_pairs_match_all_pairs():
+    rng = numpy.random.RandomState(7)
+    coordinates = rng.uniform(-6.0, 6.0, size=(300, 3))
+    radii = rng.choice([0.31, 0.76, 1.05], size=300)
+    pairs = bonded_pairs(coordinates, radii, 0.45)
+    assert len(pairs) > 0
+    assert [tuple(pair) for pair in pairs] == all_pairs(coordinates, radii, 0.45)
+
+
+def test_bonded_pairs_few_atoms():
+    assert len(bonded_pairs(numpy.zeros((1, 3)), numpy.array([0.31]), 0.45)) == 0
+    assert len(bonded_pairs(numpy.array([[0.0, 0.0, 0.0], [50.0, 0.0, 0.0]]), numpy.array([0.31, 0.31]), 0.45)) == 0
@@ -0,0 +1,46 @@
+import os
+import time
+
+from spectre.cache import JobResultCache
+
+
+def write_file(filename, content):
+    with open(filename, 'w') as f:
+        f.write(content)
+
+
+def test_store_and_fetch(tmp_path):
+    cache = JobResultCache(str(tmp_path / "cache"), 1024)
+    source = str(tmp_path / "source.loprop")
+    write_file(source, "AU\n")
+
+    assert not cache.fetch("abcdef", {"dalton_loprop.loprop": str(tmp_path / "out" / "0001_WAT.loprop")})
+    assert cache.store("abcdef", {"dalton_loprop.loprop": source})
+    assert not cache.store("abcdef", {"dalton_loprop.loprop": source})  # already stored
+
+    destination = str(tmp_path / "out" / "0001_WAT.loprop")
+    assert cache.fetch("abcdef", {"dalton_loprop.loprop": destination})
+    with open(destination) as f:
+        assert f.read() == "AU\n"
+
+
+def test_store_missing_file(tmp_path):
+    cache = JobResultCache(str(tmp_path / "cache"), 1024)
+    assert not cache.store("abcdef", {"dalton.out": str(tmp_path / "missing.out")})
+    assert not cache.has("abcdef")
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = JobResultCache(str(tmp_path / "cache"), 250)
+    source = str(tmp_path / "source.out")
+    write_file(source, 100 * "x")
+
+    cache.store("aa0001", {"dalton.out": source})
+    os.utime(cache.entry_path("aa0001"), (time.time() - 100, time.time() - 100))
+    cache.store("bb0002", {"dalton.out": source})
+    assert cache.has("aa0001") and cache.has("bb0002")
+
+    cache.store("cc0003", {"dalton.out": source})
+    assert not cache.has("aa0001")
+    assert cache.has("bb0002") and cache.has("cc0003")
+    assert cache.get_size() == 200
@@ -0,0 +1,67 @@
+import json
+
+from spectre.costs import CostModel, estimate_basis_functions, longest_processing_time
+
+
+def test_estimate_basis_functions(build_water):
+    assert estimate_basis_functions(build_water(), "6-31+G*") == 23
+    assert estimate_basis_functions(build_water(), "loprop-6-31+G*") == 23
+    assert estimate_basis_functions(build_water(), "cc-pVDZ") == 24
+    assert estimate_basis_functions(build_water(), "unknown") == 23
+
+
+def test_default_estimate_grows_with_size():
+    model = CostModel()
+    assert model.estimate("peex", 200) > model.estimate("peex", 100)
+    assert model.estimate("peex", 100) > model.estimate("loprop", 100)
+
+
+def test_fit_to_timings():
+    model = CostModel()
+    for n in [50, 100, 200, 400]:
+        model.record("loprop", n, 1.0e-3 * n**2)
+
+    scale, exponent = model.get_parameters("loprop")
+    assert abs(exponent - 2.0) < 1.0e-6
+    assert abs(scale - 1.0e-3) < 1.0e-9
+    assert abs(model.estimate("loprop", 300) - 90.0) < 1.0e-6
+
+
+def test_fit_scale_only():
+    model = CostModel()
+    model.record("peex", 100, 2.0e6 * 1.0e-6)
+    scale, exponent = model.get_parameters("peex")
+    assert exponent == 3.0
+    assert abs(scale - 2.0e-6) < 1.0e-12
+
+
+def test_telemetry_file(tmp_path):
+    filename = str(tmp_path / "telemetry" / "telemetry.json")
+    model = CostModel(filename)
+    model.record("loprop", 100, 10.0)
+    model.save()
+
+    # timings from another run are kept
+    other = CostModel(filename)
+    other.record("peex", 100, 20.0)
+    model.record("loprop", 200, 40.0)
+    other.save()
+    model.save()
+
+    with open(filename) as f:
+        records = json.load(f)
+    assert records == {"loprop": [[100, 10.0], [200, 40.0]], "peex": [[100, 20.0]]}
+
+
+def test_broken_telemetry_file(tmp_path):
+    filename = tmp_path / "telemetry.json"
+    filename.write_text("{ not json")
+    model = CostModel(str(filename))
+    assert model.get_parameters("loprop") == CostModel().get_parameters("loprop")
+
+
+def test_longest_processing_time():
+    order, assignment, makespan = longest_processing_time([1.0, 5.0, 2.0, 4.0, 3.0], 2)
+    assert order == [1, 3, 4, 2, 0]
+    assert makespan == 8.0
+    assert assignment[1] != assignment[3]
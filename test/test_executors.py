@@ -0,0 +1,196 @@
+import os
+import threading
+
+import pytest
+
+from spectre.executors import (CalcItExecutor, LocalExecutor, JobBundle, available_cpus, make_bundles, read_job_status,
+                               remove_job_results, render_bundle_script)
+
+SCRIPT = """#!/usr/bin/env bash
+# WORK_DIR: $WORK_DIR
+echo "$JOB $NCPUS $MEMORY $PROGPATH $UNKNOWN" > $WORK_DIR/$JOB.out
+python -c "import os; print(sorted(os.sched_getaffinity(0)))" > $JOB.cpus
+"""
+
+# skips the job if its log file exists like the DALTON run scripts
+SKIPPING_SCRIPT = """#!/usr/bin/env bash
+if [ ! -e $WORK_DIR/$JOB.out ]
+then
+    echo run >> $WORK_DIR/$JOB.runs
+    if [ -e $WORK_DIR/$JOB.fail ]
+    then
+        rm $WORK_DIR/$JOB.fail
+        echo error > $WORK_DIR/$JOB.out
+        exit 1
+    fi
+    echo ok > $WORK_DIR/$JOB.out
+else
+    echo "Skipping $JOB because output exists."
+fi
+"""
+
+
+class FakeJob(object):
+    def __init__(self, name, directory, script, ncpus=1):
+        self.name = name
+        self.job_directory = str(directory)
+        self.run_script_filename = str(script)
+        self.ncpus = ncpus
+        self.scratch_base = str(directory / "scratch")
+
+    def get_jobname(self):
+        return self.name
+
+    def get_run_script_substitutions(self):
+        return {'PROGPATH': "/opt/dalton", 'LD_LIBRARY_PATH': None}
+
+
+def make_jobs(tmp_path, n, ncpus=1):
+    script = tmp_path / "run.bash"
+    script.write_text(SCRIPT)
+    jobs = []
+    for i in range(n):
+        directory = tmp_path / "{0:04d}_WAT".format(i+1)
+        directory.mkdir()
+        jobs.append(FakeJob("{0:04d}_WAT_dalton_loprop".format(i+1), directory, script, ncpus))
+    return jobs
+
+
+def test_render_run_script(tmp_path):
+    job = make_jobs(tmp_path, 1, ncpus=2)[0]
+    script = LocalExecutor(cpus=[0], memory_per_cpu=500).render_run_script(job)
+    assert "# WORK_DIR: {0:s}".format(job.job_directory) in script
+    assert 'echo "0001_WAT_dalton_loprop 2 1000 /opt/dalton $UNKNOWN"' in script
+
+
+def test_cpu_groups():
+    executor = LocalExecutor(cpus=[0, 1, 2, 3, 4])
+    assert executor.get_cpu_groups(8, 2) == [[0, 1], [2, 3]]
+    assert executor.get_cpu_groups(1, 2) == [[0, 1]]
+    assert executor.get_cpu_groups(4, 8) == [[0, 1, 2, 3, 4]]
+    assert executor.get_num_slots(8, 1) == 5
+
+
+def test_process(tmp_path):
+    jobs = make_jobs(tmp_path, 3)
+    cpus = sorted(available_cpus())
+    executor = LocalExecutor(cpus=cpus[:1])
+    assert executor.process(jobs, 2, 1, str(tmp_path), True) == [0, 0, 0]
+    for job in jobs:
+        with open(os.path.join(job.job_directory, job.get_jobname() + ".out")) as f:
+            assert f.read().split()[:3] == [job.get_jobname(), "1", "1000"]
+
+
+@pytest.mark.skipif(not hasattr(os, 'sched_setaffinity'), reason="CPU pinning not supported")
+def test_process_pins_jobs(tmp_path):
+    job = make_jobs(tmp_path, 1)[0]
+    cpu = sorted(available_cpus())[-1]
+    LocalExecutor(cpus=[cpu]).process([job], 1, 1, str(tmp_path), True)
+    with open(os.path.join(job.job_directory, job.get_jobname() + ".cpus")) as f:
+        assert f.read().strip() == "[{0:d}]".format(cpu)
+
+
+def test_acquire_cpus():
+    executor = LocalExecutor(cpus=[0, 1, 2])
+    first = executor.acquire_cpus(2)
+    assert first == [0, 1]
+    acquired = []
+    waiting = threading.Thread(target=lambda: acquired.append(executor.acquire_cpus(2)))
+    waiting.start()
+    waiting.join(0.1)
+    assert acquired == []  # only one core is free
+    executor.release_cpus(first)
+    waiting.join(5.0)
+    assert acquired == [[0, 1]]
+
+
+def test_acquire_nodes():
+    executor = CalcItExecutor(["a", "b", "c"])
+    assert executor.max_concurrent_batches == 3
+    assert executor.acquire_nodes(2) == ["a", "b"]
+    assert executor.acquire_nodes(5) == ["c"]
+    executor.release_nodes(["a"])
+    assert executor.acquire_nodes(0) == ["a"]
+
+
+def test_process_dryrun(tmp_path):
+    jobs = make_jobs(tmp_path, 2)
+    assert LocalExecutor(cpus=[0]).process(jobs, 1, 1, str(tmp_path), False) == [None, None]
+    for job in jobs:
+        assert os.path.exists(os.path.join(job.job_directory, job.get_jobname() + ".sh"))
+        assert not os.path.exists(os.path.join(job.job_directory, job.get_jobname() + ".out"))
+
+
+def test_make_bundles(tmp_path):
+    jobs = make_jobs(tmp_path, 6)
+    units = make_bundles(jobs, [100.0, 4.0, 3.0, 2.0, 2.0, 1.0], 5.0, 2, str(tmp_path / "bundles"))
+    assert units[0] is jobs[0]
+    assert units[1] is jobs[1]  # a bundle of a single job is the job itself
+    assert [unit.members for unit in units[2:]] == [jobs[2:4], jobs[4:6]]
+
+
+def test_make_bundles_one_per_slot(tmp_path):
+    jobs = make_jobs(tmp_path, 4)
+    units = make_bundles(jobs, [1.0, 1.0, 1.0, 1.0], 100.0, 2, str(tmp_path / "bundles"))
+    assert len(units) == 2
+    assert all(isinstance(unit, JobBundle) for unit in units)
+
+
+def test_make_bundles_without_costs(tmp_path):
+    jobs = make_jobs(tmp_path, 4)
+    units = make_bundles(jobs, [0.0] * 4, 100.0, 4, str(tmp_path / "bundles"))
+    assert units == jobs
+
+
+def test_process_bundle(tmp_path):
+    jobs = make_jobs(tmp_path, 3)
+    jobs[1].run_script_filename = str(tmp_path / "fail.bash")
+    (tmp_path / "fail.bash").write_text("exit 3\n")
+    bundle = JobBundle("bundle_00001", jobs, str(tmp_path))
+    assert LocalExecutor(cpus=[0]).process([bundle], 1, 1, str(tmp_path), True) == [0]
+    assert [read_job_status(job) for job in jobs] == [0, 3, 0]
+    assert os.path.exists(os.path.join(jobs[2].job_directory, jobs[2].get_jobname() + ".out"))
+
+
+def test_bundle_script_inlines_members(tmp_path):
+    jobs = make_jobs(tmp_path, 2, ncpus=2)
+    bundle = JobBundle("bundle_00001", jobs, str(tmp_path))
+    script = render_bundle_script(bundle)
+    assert "bash" not in script.replace("#!/usr/bin/env bash", "")  # no shell is started per member
+    assert 'echo "0001_WAT_dalton_loprop 2 $MEMORY /opt/dalton $UNKNOWN"' in script
+    assert 'echo "0002_WAT_dalton_loprop 2 1000 /opt/dalton $UNKNOWN"' in render_bundle_script(bundle, 500)
+
+
+def test_calcit_bundle_jobs(tmp_path):
+    jobs = make_jobs(tmp_path, 3)
+    bundle = JobBundle("bundle_00001", jobs[1:], str(tmp_path))
+    assert not CalcItExecutor(["localhost"]).supports_bundles
+    executor = CalcItExecutor(["localhost"], bundle_job=lambda unit: ("calcit", unit.get_jobname()))
+    assert executor.supports_bundles
+    assert executor.get_calcit_jobs([jobs[0], bundle]) == [jobs[0], ("calcit", "bundle_00001")]
+    assert os.path.exists(str(tmp_path / "bundle_00001.bundle"))
+
+
+def test_retry_runs_failed_job_again(tmp_path):
+    job = make_jobs(tmp_path, 1)[0]
+    (tmp_path / "run.bash").write_text(SKIPPING_SCRIPT)
+    prefix = os.path.join(job.job_directory, job.get_jobname())
+    open(prefix + ".fail", 'w').close()
+    open(prefix + ".dal", 'w').close()
+    executor = LocalExecutor(cpus=[0])
+    assert executor.process([job], 1, 1, str(tmp_path), True) == [1]
+
+    # without removing the results the script skips the job
+    executor.process([job], 1, 1, str(tmp_path), True)
+    with open(prefix + ".runs") as f:
+        assert len(f.readlines()) == 1
+
+    removed = remove_job_results(job)
+    assert sorted(os.path.basename(filename) for filename in removed) == [job.get_jobname() + ".out",
+                                                                          job.get_jobname() + ".status"]
+    assert os.path.exists(prefix + ".dal")
+    assert executor.process([job], 1, 1, str(tmp_path), True) == [0]
+    with open(prefix + ".runs") as f:
+        assert len(f.readlines()) == 2
+    with open(prefix + ".out") as f:
+        assert f.read().strip() == "ok"
@@ -0,0 +1,60 @@
+import numpy
+
+from spectre.molecool.atom import Atom
+from spectre.molecool.molecule import Molecule
+import spectre.geometry
+
+
+def build_molecule(coordinates):
+    mol = Molecule()
+    for xyz in coordinates:
+        mol.add_atom(Atom(1, xyz=xyz))
+    return mol
+
+
+def test_minimum_distance():
+    a = numpy.array([[0.0, 0.0, 0.0], [1.0, 0.0, 0.0]])
+    b = numpy.array([[4.0, 0.0, 0.0], [0.0, 5.0, 0.0]])
+    assert abs(spectre.geometry.minimum_distance(a, b) - 3.0) < 1.0e-9
+
+
+def test_molecules_within_distance():
+    molecules = [build_molecule([[0.0, 0.0, 0.0]]),
+                 build_molecule([[2.0, 0.0, 0.0]]),
+                 build_molecule([[0.0, 10.0, 0.0], [0.0, 4.0, 0.0]])]
+    assert spectre.geometry.molecules_within_distance(molecules, 0, 3.0) == [1]
+    assert spectre.geometry.molecules_within_distance(molecules, 0, 4.0) == [1, 2]
+    assert spectre.geometry.molecules_within_distance(molecules, 1, -1.0) == [0, 2]
+
+
+def test_molecules_near():
+    molecules = [build_molecule([[0.0, 0.0, 0.0]]),
+                 build_molecule([[2.0, 0.0, 0.0]]),
+                 build_molecule([[0.0, 10.0, 0.0], [0.0, 4.0, 0.0]]),
+                 build_molecule([[0.0, 20.0, 0.0]])]
+    assert spectre.geometry.molecules_near(molecules, [0], 3.0) == [0, 1]
+    assert spectre.geometry.molecules_near(molecules, [3, 0], 3.0) == [0, 1, 3]
+    assert spectre.geometry.molecules_near(molecules, [0], 4.0) == [0, 1, 2]
+    assert spectre.geometry.molecules_near(molecules, [], 4.0) == []
+    assert spectre.geometry.molecules_near(molecules, [0], -1.0) == [0, 1, 2, 3]
+
+
+def test_kabsch_rotation():
+    reference = numpy.array([[0.0, 0.0, 0.0], [0.96, 0.0, 0.0], [-0.24, 0.93, 0.0]])
+    angle = 0.3
+    rotation = numpy.array([[numpy.cos(angle), 0.0, numpy.sin(angle)],
+                            [0.0, 1.0, 0.0],
+                            [-numpy.sin(angle), 0.0, numpy.cos(angle)]])
+    target = reference.dot(rotation.T) + numpy.array([1.0, 2.0, 3.0])
+    found, rmsd = spectre.geometry.kabsch_rotation(reference, target)
+    assert numpy.allclose(found, rotation)
+    assert rmsd < 1.0e-9
+
+
+def test_rigid_body_clusters():
+    reference = [[0.0, 0.0, 0.0], [0.96, 0.0, 0.0], [-0.24, 0.93, 0.0]]
+    translated = [[x + 5.0, y, z] for x, y, z in reference]
+    distorted = [[0.0, 0.0, 0.0], [1.5, 0.0, 0.0], [-0.24, 0.93, 0.0]]
+    molecules = [build_molecule(reference), build_molecule(translated), build_molecule(distorted)]
+    assert spectre.geometry.rigid_body_clusters(molecules, 0.01) == [0, 0, 2]
+    assert spectre.geometry.rigid_body_clusters(molecules, -1.0) == [0, 1, 2]
@@ -0,0 +1,14 @@
+import spectre.hashing
+
+
+def test_molecule_digest_is_reproducible(build_water):
+    d1 = spectre.hashing.molecule_digest(build_water(), "6-31+G*", None)
+    d2 = spectre.hashing.molecule_digest(build_water(), "6-31+G*", None)
+    assert d1 == d2
+
+
+def test_molecule_digest_depends_on_geometry_and_settings(build_water):
+    d0 = spectre.hashing.molecule_digest(build_water(), "6-31+G*", None)
+    assert d0 != spectre.hashing.molecule_digest(build_water(shift=(1.0, 0.0, 0.0)), "6-31+G*", None)
+    assert d0 != spectre.hashing.molecule_digest(build_water(), "6-31G", None)
+    assert d0 != spectre.hashing.molecule_digest(build_water(), "6-31+G*", "B3LYP")
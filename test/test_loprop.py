@@ -0,0 +1,62 @@
+import io
+
+import numpy
+
+import spectre.loprop
+
+LOPROP_DATA = """AU
+2 1 2 1
+1     0.000000000     0.000000000     0.000000000    -0.500000000     0.100000000     0.000000000     0.000000000     5.000000000     0.000000000     0.000000000     4.000000000     0.000000000     3.000000000
+1     1.800000000     0.000000000     0.000000000     0.500000000     0.000000000     0.200000000     0.000000000     1.000000000     0.000000000     0.000000000     1.000000000     0.000000000     1.000000000
+
+Time used in Loprop              :      0.01 (cpu)       0.01 (wall)
+"""
+
+
+def test_read_loprop_data():
+    data = spectre.loprop.read_loprop_data(io.StringIO(LOPROP_DATA))
+    assert data.get_num_atoms() == 2
+    assert data.get_multipole_order() == 1
+    assert data.get_polarizability_order() == 2
+    assert abs(data.coordinates[1][0] - 1.8) < 1.0e-9
+    assert abs(data.multipoles[0][0][0] + 0.5) < 1.0e-9
+    assert abs(data.multipoles[1][1][1] - 0.2) < 1.0e-9
+    assert len(data.polarizabilities[0]) == 6
+
+
+def test_write_read_roundtrip():
+    data = spectre.loprop.read_loprop_data(io.StringIO(LOPROP_DATA))
+    f = io.StringIO()
+    spectre.loprop.write_loprop_data(f, data)
+    f.seek(0)
+    other = spectre.loprop.read_loprop_data(f)
+    assert numpy.allclose(data.coordinates, other.coordinates)
+    for l in data.multipoles:
+        assert numpy.allclose(data.multipoles[l], other.multipoles[l])
+    assert numpy.allclose(data.polarizabilities, other.polarizabilities)
+
+
+def test_rotate_loprop_data():
+    data = spectre.loprop.read_loprop_data(io.StringIO(LOPROP_DATA))
+
+    # 90 degrees around z takes x to y
+    rotation = numpy.array([[0.0, -1.0, 0.0], [1.0, 0.0, 0.0], [0.0, 0.0, 1.0]])
+    coordinates = data.coordinates.dot(rotation.T)
+    rotated = spectre.loprop.rotate_loprop_data(data, rotation, coordinates)
+
+    assert numpy.allclose(rotated.coordinates[1], [0.0, 1.8, 0.0])
+    assert numpy.allclose(rotated.multipoles[0], data.multipoles[0])
+    assert numpy.allclose(rotated.multipoles[1][0], [0.0, 0.1, 0.0])
+    assert numpy.allclose(rotated.multipoles[1][1], [-0.2, 0.0, 0.0])
+
+    # xx and yy components of the polarizability are swapped
+    assert numpy.allclose(rotated.polarizabilities[0], [4.0, 0.0, 0.0, 5.0, 0.0, 3.0])
+
+
+def test_loprop_data_digest():
+    data = spectre.loprop.read_loprop_data(io.StringIO(LOPROP_DATA))
+    other = spectre.loprop.read_loprop_data(io.StringIO(LOPROP_DATA))
+    assert spectre.loprop.loprop_data_digest(data) == spectre.loprop.loprop_data_digest(other)
+
+    other.multipoles[0][0][0] = -0.4
+    assert spectre.loprop.loprop_data_digest(data) != spectre.loprop.loprop_data_digest(other)
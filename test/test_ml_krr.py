@@ -0,0 +1,100 @@
+import io
+
+import numpy
+import pytest
+
+from spectre.errors import SpectreValueError
+from spectre.loprop import LoPropData, write_loprop_data
+from spectre.molecool.atom import Atom
+from spectre.molecool.formatters import XYZMoleculeFormatter
+from spectre.molecool.molecule import Molecule
+from spectre.ml.krr import KRRModel, atomic_properties, predict_atomic_values, radial_descriptors, train_model
+from spectre.ml.train import read_training_data, read_xyz_molecule
+from spectre.workspace import Workspace
+
+
+def training_set(build_water):
+    molecules = [build_water(angle, distance) for angle in numpy.linspace(1.7, 2.0, 4) for distance in [0.94, 0.98]]
+    charges = numpy.array([[-2.0 * a, a, a] for a in numpy.linspace(0.3, 0.4, len(molecules))])
+    polarizabilities = numpy.array([[5.0 + a, 1.0 + a, 1.0 + a] for a in numpy.linspace(0.0, 0.2, len(molecules))])
+    return molecules, charges, polarizabilities
+
+
+def test_radial_descriptors_are_invariant(build_water):
+    molecule = build_water(1.8)
+    coordinates = molecule.get_coordinates()
+    angle = 0.7
+    rotation = numpy.array([[numpy.cos(angle), -numpy.sin(angle), 0.0],
+                            [numpy.sin(angle), numpy.cos(angle), 0.0],
+                            [0.0, 0.0, 1.0]])
+    moved = coordinates.dot(rotation.T) + numpy.array([3.0, -1.0, 2.0])
+    centers = numpy.linspace(0.0, 4.0, 8)
+    descriptors = radial_descriptors([8, 1, 1], numpy.array([coordinates, moved]), [1, 8], centers, 0.3, 4.0)
+    assert descriptors.shape == (2, 3, 24)
+    assert numpy.allclose(descriptors[0], descriptors[1])
+
+    # the oxygen only has hydrogen neighbours
+    assert numpy.allclose(descriptors[0, 0, 8:16], 0.0)
+    assert numpy.allclose(descriptors[0, 1], descriptors[0, 2])
+
+    # the features of the oxygen depend on the angle
+    other = radial_descriptors([8, 1, 1], numpy.array([build_water(1.9).get_coordinates()]), [1, 8], centers, 0.3, 4.0)
+    assert numpy.allclose(descriptors[0, 0, :16], other[0, 0, :16])
+    assert not numpy.allclose(descriptors[0, 0, 16:], other[0, 0, 16:])
+
+
+def test_train_and_predict(tmp_path, build_water):
+    molecules, charges, polarizabilities = training_set(build_water)
+    model = train_model(molecules, charges, polarizabilities, sigma=0.5, regularization=1.0e-10)
+    assert model.get_num_training_atoms() == 3 * len(molecules)
+    assert model.max_size == 3
+
+    predicted = predict_atomic_values(molecules, model, chunk_size=3)
+    assert numpy.allclose(predicted[0], charges.ravel(), atol=1.0e-5)
+    assert numpy.allclose(predicted[1], polarizabilities.ravel(), atol=1.0e-5)
+
+    filename = str(tmp_path / "WAT_krr.npz")
+    model.save(filename)
+    loaded = KRRModel.from_file(filename, mmap_directory=str(tmp_path / "mmap"))
+    q, p, max_size = atomic_properties(molecules[:2], loaded)
+    assert max_size == 3
+    assert numpy.allclose(q, predicted[0][:6])
+    assert numpy.allclose(p, predicted[1][:6])
+
+
+def test_predict_other_species(build_water):
+    molecules, charges, polarizabilities = training_set(build_water)
+    model = train_model(molecules, charges, polarizabilities)
+    other = Molecule()
+    other.add_atom(Atom(1, xyz=[0.0, 0.0, 0.0]))
+    other.set_name("H")
+    with pytest.raises(SpectreValueError):
+        predict_atomic_values([other], model)
+
+
+def test_read_xyz_molecule():
+    molecule = read_xyz_molecule(io.StringIO("2\nHH\nH 0.0 0.0 0.0\nH 0.0 0.0 0.74\n"))
+    assert molecule.get_name() == "HH"
+    assert molecule.get_num_atoms() == 2
+    assert numpy.allclose(molecule.get_coordinates()[1], [0.0, 0.0, 0.74])
+
+
+def test_read_training_data(tmp_path, build_water):
+    workspace = Workspace(str(tmp_path))
+    molecules, charges, polarizabilities = training_set(build_water)
+    for i, molecule in enumerate(molecules[:2], start=1):
+        name = "{0:04d}_WAT".format(i)
+        workspace.directory(name)
+        with open(workspace.file(name, ".xyz"), 'w') as f:
+            f.write(str(XYZMoleculeFormatter(molecule)))
+        data = LoPropData(molecule.get_coordinates(), {0: charges[i-1].reshape(-1, 1).tolist()},
+                          [[a, 0.0, 0.0, a, 0.0, a] for a in polarizabilities[i-1]])
+        with open(workspace.file(name, "_dalton_loprop.loprop"), 'w') as f:
+            write_loprop_data(f, data)
+    workspace.pack(["0002_WAT"])
+    workspace.directory("0003_WAT")  # without results
+
+    read_molecules, read_charges, read_polarizabilities = read_training_data(workspace, "WAT")
+    assert len(read_molecules) == 2
+    assert numpy.allclose(read_charges, charges[:2])
+    assert numpy.allclose(read_polarizabilities, polarizabilities[:2])
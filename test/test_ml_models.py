@@ -0,0 +1,100 @@
+import os
+
+import numpy
+
+from spectre.ml.models import MLExcitedStateModel, MLModel, ModelRegistry
+
+
+def write_model(filename, scale=1.0):
+    numpy.savez(filename,
+                alpha_q=scale * numpy.arange(6.0),
+                alpha_p=scale * numpy.ones(6),
+                representation=numpy.arange(6 * 5 * 3, dtype=float).reshape(6, 5, 3),
+                sigma=numpy.array([2.5]),
+                max_size=numpy.array([3]),
+                cut_distance=numpy.array([8.0]))
+
+
+def test_from_file(tmp_path):
+    filename = str(tmp_path / "WAT.npz")
+    write_model(filename)
+
+    model = MLModel.from_file(filename, mmap_directory=str(tmp_path / "mmap"))
+    assert model.max_size == 3
+    assert model.cut_distance == 8.0
+    assert model.alphas.shape == (2, 6)
+    assert isinstance(model.representation, numpy.memmap)
+    assert model.representation.shape == (6, 5, 3)
+    assert model.representation[5, 4, 2] == 89.0
+    assert len(os.listdir(str(tmp_path / "mmap"))) == 1
+
+    in_memory = MLModel.from_file(filename)
+    assert not isinstance(in_memory.representation, numpy.memmap)
+    assert in_memory.digest == model.digest
+
+
+def test_excited_state_model(tmp_path):
+    filename = str(tmp_path / "CHR.npz")
+    numpy.savez(filename,
+                alpha_tq=numpy.arange(12.0).reshape(2, 6),
+                alpha_e=numpy.ones((2, 6)),
+                representation=numpy.zeros((6, 5, 3)),
+                sigma=numpy.array([2.5]),
+                max_size=numpy.array([3]),
+                cut_distance=numpy.array([8.0]))
+
+    model = MLExcitedStateModel.from_file(filename)
+    assert model.get_num_excited_states() == 2
+    assert model.alphas.shape == (4, 6)
+    assert model.alphas[1, 0] == 6.0
+
+    registry = ModelRegistry(mmap_directory=str(tmp_path / "mmap"))
+    assert isinstance(registry.get(filename, MLExcitedStateModel), MLExcitedStateModel)
+
+
+def test_kernel_terms_are_computed_once(tmp_path):
+    filename = str(tmp_path / "WAT.npz")
+    write_model(filename)
+    model = MLModel.from_file(filename)
+
+    calls = []
+
+    def compute(m):
+        calls.append(m)
+        return m.representation.sum()
+
+    assert model.get_kernel_term("sum", compute) == model.get_kernel_term("sum", compute)
+    assert len(calls) == 1
+
+
+def test_registry(tmp_path):
+    registry = ModelRegistry(max_models=2, mmap_directory=str(tmp_path / "mmap"))
+    filenames = [str(tmp_path / "{0:s}.npz".format(name)) for name in ["WAT", "ACE", "MEO"]]
+    for filename in filenames:
+        write_model(filename)
+
+    model = registry.get(filenames[0])
+    assert registry.get(filenames[0]) is model
+    registry.get(filenames[1])
+    registry.get(filenames[0])  # most recently used
+    registry.get(filenames[2])
+    assert len(registry) == 2
+    assert registry.get(filenames[0]) is model
+
+    # a changed file is loaded again
+    write_model(filenames[0], scale=2.0)
+    os.utime(filenames[0], ns=(0, 0))
+    changed = registry.get(filenames[0])
+    assert changed is not model
+    assert changed.alpha_q[1] == 2.0
+
+
+def test_molecules_per_chunk(tmp_path):
+    filename = str(tmp_path / "WAT.npz")
+    write_model(filename)
+    model = MLModel.from_file(filename)
+
+    # 3 atoms per molecule with a kernel of 6 training atoms and a 3 x 5 x 3 representation
+    assert model.molecules_per_chunk(1.0) == 1024**2 // (3 * 8 * (6 + 15))
+    assert model.molecules_per_chunk(2.0) > model.molecules_per_chunk(1.0)
+    assert model.molecules_per_chunk(0.0) == 1
@@ -0,0 +1,62 @@
+import copy
+
+import numpy
+import pytest
+
+from spectre.molecool.atom import Atom
+from spectre.molecool.molecule import AtomView, Molecule
+
+
+def test_from_arrays(build_water):
+    mol = build_water()
+    assert mol.get_name() == "WAT"
+    assert mol.get_num_atoms() == 3
+    assert list(mol.get_nuclear_charges()) == [8, 1, 1]
+    assert [atom.get_label() for atom in mol.get_atoms()] == ["O", "H", "H"]
+    assert mol.get_atom(1).get_covalent_radius() == Atom(1).get_covalent_radius()
+    assert len(list(mol.get_bonds())) == 2
+    with pytest.raises(ValueError):
+        Molecule.from_arrays([8, 1], numpy.zeros((3, 3)))
+
+
+def test_atoms_are_views(build_water):
+    mol = build_water()
+    atom = mol.get_atom(1)
+    assert isinstance(atom, AtomView)
+    atom.set_coordinate(numpy.array([1.0, 0.0, 0.0]))
+    atom.set_formal_charge(1)
+    assert numpy.allclose(mol.get_coordinates()[1], [1.0, 0.0, 0.0])
+    assert mol.get_atom(1).get_formal_charge() == 1
+
+    # copies do not change the molecule
+    other = copy.deepcopy(atom)
+    assert type(other) is Atom
+    other.set_formal_charge(0)
+    assert atom.get_formal_charge() == 1
+
+
+def test_coordinates_are_views(build_water):
+    mol = build_water()
+    coordinates = mol.get_coordinates()
+    assert numpy.shares_memory(coordinates, mol.get_coordinates())
+    mol.set_coordinates(coordinates + 1.0)
+    assert numpy.allclose(mol.get_coordinates()[0], [1.0, 1.0, 1.0])
+    with pytest.raises(ValueError):
+        mol.set_coordinates(numpy.zeros((2, 3)))
+
+
+def test_add_atoms(build_water):
+    mol = Molecule()
+    for i in range(20):
+        mol.add_atom(Atom(6, xyz=[1.5 * i, 0.0, 0.0], idx=i, fcharge=i % 2))
+    assert mol.get_num_atoms() == 20
+    assert numpy.allclose(mol.get_coordinates()[:, 0], 1.5 * numpy.arange(20))
+    assert [atom.get_formal_charge() for atom in mol.get_atoms()][:4] == [0, 1, 0, 1]
+    assert len(list(mol.get_bonds())) == 19
+
+    combined = Molecule.from_molecule(build_water())
+    combined.add_atoms(*list(mol.get_atoms()))
+    assert combined.get_num_atoms() == 23
+    assert combined.get_atom(3).get_idx() == 0
+    assert numpy.allclose(combined.get_center_of_mass(), numpy.average(
+        combined.get_coordinates(), axis=0, weights=[atom.get_mass() for atom in combined.get_atoms()]))
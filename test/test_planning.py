@@ -0,0 +1,40 @@
+from spectre.costs import CostModel
+from spectre.planning import StagePlan, estimate_job_memory, estimate_potential_size
+
+
+def test_estimate_job_memory():
+    assert estimate_job_memory("peex", 0) == 256.0
+    assert estimate_job_memory("peex", 1000) > estimate_job_memory("pde_monomer", 1000)
+    assert estimate_job_memory("peex", 1000, 4) > estimate_job_memory("peex", 1000)
+
+
+def test_estimate_potential_size():
+    # charges only: coordinates and a single value per site
+    assert estimate_potential_size(10, 0, 0) == 10 * (64 + 16)
+    # up to quadrupoles (1 + 3 + 6 values) and polarizabilities (6 values)
+    assert estimate_potential_size(10, 2, 2, 30) == 10 * (64 + 16 * 16) + 30 * 6
+    assert estimate_potential_size(10, 2, 1) == estimate_potential_size(10, 2, 2)
+
+
+def test_stage_plan(build_water):
+    model = CostModel()
+    stage = StagePlan("LoProp", "loprop", "loprop-6-31+G*", model, cpus_per_job=2)
+    stage.add(build_water())
+    stage.add(build_water())
+    stage.add(build_water(), done=True)
+
+    assert stage.get_num_jobs() == 2
+    assert stage.num_done == 1
+    assert stage.get_max_basis_functions() == 23
+    assert stage.get_durations() == [model.estimate("loprop", 23) / 2] * 2
+    assert abs(stage.get_core_hours() - 2 * model.estimate("loprop", 23) / 3600.0) < 1.0e-12
+    assert abs(stage.get_makespan(1) - 2 * stage.get_makespan(2)) < 1.0e-12
+    assert stage.get_max_memory() == estimate_job_memory("loprop", 23)
+
+
+def test_empty_stage_plan():
+    stage = StagePlan("Excited states", "peex", "6-31+G*", CostModel())
+    assert stage.get_num_jobs() == 0
+    assert stage.get_max_memory() == 0.0
+    assert stage.get_core_hours() == 0.0
+    assert stage.get_makespan(4) == 0.0
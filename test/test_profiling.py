@@ -0,0 +1,70 @@
+import json
+import threading
+
+from spectre.profiling import Profiler
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = Profiler()
+    with profiler.span("fragmentation") as span:
+        span.count("fragments", 3)
+    assert profiler.get_spans() == []
+
+
+def test_nested_spans():
+    profiler = Profiler()
+    profiler.enable()
+    with profiler.span("coupling", chromophores=2):
+        for _ in range(3):
+            with profiler.span("J0") as span:
+                span.count("pairs")
+                span.count("pairs")
+        with profiler.span("diagonalization"):
+            pass
+
+    spans = profiler.get_spans()
+    assert [s.path for s in spans] == ["coupling/J0"] * 3 + ["coupling/diagonalization", "coupling"]
+    assert all(s.wall >= 0.0 and s.peak_rss >= 0.0 for s in spans)
+
+    summary = profiler.summary()
+    assert [row[:2] for row in summary] == [("coupling", 1), ("coupling/J0", 3), ("coupling/diagonalization", 1)]
+    assert summary[0][-1] == {"chromophores": 2}
+    assert summary[1][-1] == {"pairs": 6}
+    assert "    J0" not in profiler.format_summary()
+    assert "  J0" in profiler.format_summary()
+
+
+def test_spans_of_threads_are_not_nested():
+    profiler = Profiler()
+    profiler.enable()
+
+    def task():
+        with profiler.span("task"):
+            pass
+
+    with profiler.span("workflow"):
+        thread = threading.Thread(target=task)
+        thread.start()
+        thread.join()
+        with profiler.span("parsing"):
+            pass
+
+    assert sorted(s.path for s in profiler.get_spans()) == ["task", "workflow", "workflow/parsing"]
+
+
+def test_write_trace(tmp_path):
+    profiler = Profiler()
+    profiler.enable()
+    with profiler.span("excited states"):
+        with profiler.span("staging", jobs=4):
+            pass
+
+    filename = str(tmp_path / "trace.json")
+    profiler.write_trace(filename)
+    with open(filename) as f:
+        events = json.load(f)["traceEvents"]
+    assert [e["name"] for e in events] == ["staging", "excited states"]
+    assert all(e["ph"] == "X" and e["cat"] == "excited states" for e in events)
+    assert events[0]["args"]["jobs"] == 4
+    assert events[0]["ts"] >= events[1]["ts"]
+    assert events[0]["ts"] + events[0]["dur"] <= events[1]["ts"] + events[1]["dur"]
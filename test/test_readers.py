@@ -1,4 +1,4 @@
-from spectre.readers import get_chromophore_peex_data
+from spectre.readers import get_chromophore_peex_data, get_dalton_log_error, get_dalton_wall_time
 
 
 def test_m0_reader():
@@ -84,3 +84,29 @@ def test_m2_reader():
             assert len(tr_quad[i][j]) == 6
     assert abs(tr_quad[2][0][5] - (-0.279883)) < 1.0e-9  # 3rd excitation, 1st atom, 6th element of quad tensor
     assert abs(tr_quad[3][0][0] - 0.266974) < 1.0e-9  # 3rd excitation, 1st atom, 6th element of quad tensor
+
+
+def test_dalton_wall_time(tmp_path):
+    assert abs(get_dalton_wall_time("test/m0.out") - 0.87) < 1.0e-9
+    assert get_dalton_wall_time(str(tmp_path / "missing.out")) is None
+
+    filename = str(tmp_path / "long.out")
+    with open(filename, "w") as f:
+        f.write(">>>> Total wall time used in DALTON:   1 hour  2 minutes  3 seconds\n")
+    assert abs(get_dalton_wall_time(filename) - 3723.0) < 1.0e-9
+
+
+def test_dalton_log_error(tmp_path):
+    assert get_dalton_log_error("test/m0.out") is None
+    assert get_dalton_log_error(str(tmp_path / "missing.out")) == "missing log file"
+
+    filename = str(tmp_path / "incomplete.out")
+    with open(filename, "w") as f:
+        f.write("@ Excitation energy :  0.1  au\n")
+    assert get_dalton_log_error(filename) == "incomplete log file"
+
+    filename = str(tmp_path / "error.out")
+    with open(filename, "w") as f:
+        f.write(" --- SEVERE ERROR, PROGRAM WILL BE ABORTED ---\n")
+        f.write(">>>> Total wall time used in DALTON:   0.87 seconds\n")
+    assert get_dalton_log_error(filename).startswith("error in log file: --- SEVERE ERROR")
@@ -0,0 +1,146 @@
+import threading
+import time
+
+import pytest
+
+from spectre.scheduler import TaskGraph, SpectreSchedulerError
+
+
+def test_dependency_order():
+    order = []
+    graph = TaskGraph()
+    graph.add_task("c", lambda: order.append("c"), dependencies=["a", "b"])
+    graph.add_task("a", lambda: order.append("a"))
+    graph.add_task("b", lambda: order.append("b"), dependencies=["a"])
+    graph.run(lambda key, jobs: None, num_workers=2)
+    assert order == ["a", "b", "c"]
+
+
+def test_task_results():
+    graph = TaskGraph()
+    graph.add_task("a", lambda: 2)
+    graph.add_task("b", lambda: graph.get_result("a") * 3, dependencies=["a"])
+    graph.run(lambda key, jobs: None)
+    assert graph.get_result("b") == 6
+
+
+def test_ready_jobs_are_dispatched_together():
+    batches = []
+    started = threading.Event()
+    built = [threading.Event() for _ in range(3)]
+
+    def dispatch(key, jobs):
+        batches.append((key, sorted(jobs)))
+        if jobs == ["first"]:
+            started.set()
+            for event in built:
+                event.wait(5.0)
+            time.sleep(0.1)
+
+    def build(i, name):
+        built[i].set()
+        return [name]
+
+    graph = TaskGraph()
+    graph.add_jobs("first", lambda: ["first"], batch_key=1)
+    # these become ready while the first batch is running
+    graph.add_task("trigger", lambda: started.wait(5.0))
+    graph.add_jobs("x", lambda: build(0, "x"), dependencies=["trigger"], batch_key=1)
+    graph.add_jobs("y", lambda: build(1, "y"), dependencies=["trigger"], batch_key=1)
+    graph.add_jobs("z", lambda: build(2, "z"), dependencies=["trigger"], batch_key=2)
+    graph.run(dispatch, num_workers=2, max_batches=1)
+
+    assert batches[0] == (1, ["first"])
+    assert (1, ["x", "y"]) in batches
+    assert (2, ["z"]) in batches
+    assert len(batches) == 3
+
+
+def test_batches_run_concurrently():
+    batches = []
+    second_started = threading.Event()
+
+    def dispatch(key, jobs):
+        batches.append((key, jobs))
+        if jobs == ["first"]:
+            # only finishes once the jobs that became ready later are running
+            assert second_started.wait(5.0)
+        else:
+            second_started.set()
+
+    graph = TaskGraph()
+    graph.add_jobs("first", lambda: ["first"], batch_key=1)
+    graph.add_task("trigger", lambda: time.sleep(0.1))
+    graph.add_jobs("second", lambda: ["second"], dependencies=["trigger"], batch_key=1)
+    graph.run(dispatch, num_workers=2, max_batches=2)
+
+    assert batches == [(1, ["first"]), (1, ["second"])]
+
+
+def test_job_node_without_jobs():
+    batches = []
+    graph = TaskGraph()
+    graph.add_jobs("cached", lambda: [])
+    graph.add_task("after", lambda: 1, dependencies=["cached"])
+    graph.run(lambda key, jobs: batches.append(jobs))
+    assert batches == []
+    assert graph.get_result("after") == 1
+
+
+def test_nodes_added_while_running():
+    graph = TaskGraph()
+    graph.add_task("a", lambda: graph.add_task("b", lambda: "b", dependencies=["a"]))
+    graph.run(lambda key, jobs: None)
+    assert graph.get_result("b") == "b"
+
+
+def test_duplicate_node():
+    graph = TaskGraph()
+    graph.add_task("a", lambda: None)
+    with pytest.raises(SpectreSchedulerError):
+        graph.add_task("a", lambda: None)
+
+
+def test_unknown_dependency():
+    graph = TaskGraph()
+    graph.add_task("a", lambda: None, dependencies=["missing"])
+    with pytest.raises(SpectreSchedulerError):
+        graph.run(lambda key, jobs: None)
+
+
+def test_cycle():
+    graph = TaskGraph()
+    graph.add_task("a", lambda: None, dependencies=["b"])
+    graph.add_task("b", lambda: None, dependencies=["a"])
+    with pytest.raises(SpectreSchedulerError):
+        graph.run(lambda key, jobs: None)
+
+
+def test_task_exception():
+    def fail():
+        raise ValueError("failed")
+
+    graph = TaskGraph()
+    graph.add_task("a", fail)
+    with pytest.raises(ValueError):
+        graph.run(lambda key, jobs: None)
+
+
+def test_exception_does_not_wait_for_running_batch():
+    release = threading.Event()
+    dispatched = []
+
+    def fail():
+        time.sleep(0.1)
+        raise ValueError("failed")
+
+    graph = TaskGraph()
+    graph.add_jobs("long", lambda: ["long"], batch_key=1)
+    graph.add_task("fail", fail)
+    graph.add_task("after", lambda: dispatched.append("after"), dependencies=["fail"])
+    t0 = time.time()
+    with pytest.raises(ValueError):
+        graph.run(lambda key, jobs: release.wait(5.0), num_workers=2)
+    assert time.time() - t0 < 2.0
+    assert dispatched == []
+    release.set()
@@ -0,0 +1,256 @@
+import os
+import shutil
+import threading
+
+import pytest
+
+import spectre.archive
+from spectre.molecool.molecule import Molecule
+from spectre.workspace import Workspace, molecule_name
+
+
+def test_paths(tmp_path):
+    workspace = Workspace(str(tmp_path / "system"))
+    assert workspace.path("0001_WAT") == str(tmp_path / "system" / "0001_WAT")
+    assert workspace.file("0001_WAT", ".xyz") == str(tmp_path / "system" / "0001_WAT" / "0001_WAT.xyz")
+
+    directory = workspace.directory("0001_WAT")
+    assert os.path.isdir(directory)
+    assert workspace.directory("0001_WAT") == directory
+
+
+def test_molecule_name():
+    molecule = Molecule()
+    molecule.set_name("WAT")
+    assert molecule_name(7, molecule) == "0007_WAT"
+
+
+def test_pack_and_unpack(tmp_path):
+    workspace = Workspace(str(tmp_path))
+    for name in ["0001_WAT", "0002_WAT"]:
+        workspace.directory(name)
+        with open(workspace.file(name, ".xyz"), 'w') as f:
+            f.write(name)
+
+    workspace.pack(["0001_WAT", "0002_WAT"], num_threads=2)
+    assert not os.path.exists(workspace.path("0001_WAT"))
+    assert workspace.exists("0002_WAT", "0002_WAT.xyz")
+    with workspace.open("0002_WAT", "0002_WAT.xyz") as f:
+        assert f.read() == "0002_WAT"
+
+    # files of a directory packed again replace the archived ones and the rest are kept
+    workspace.directory("0001_WAT")
+    with open(workspace.file("0001_WAT", ".loprop"), 'w') as f:
+        f.write("new")
+    workspace.pack(["0001_WAT"])
+    assert workspace.archive.names() == ["0001_WAT/0001_WAT.loprop", "0001_WAT/0001_WAT.xyz", "0002_WAT/0002_WAT.xyz"]
+
+    assert workspace.unpack("0001_WAT")
+    with open(workspace.file("0001_WAT", ".xyz")) as f:
+        assert f.read() == "0001_WAT"
+    assert not os.path.exists(workspace.path("0002_WAT"))
+    assert not workspace.unpack("0003_WAT")
+
+
+def test_unpack_legacy_archive(tmp_path):
+    workspace = Workspace(str(tmp_path))
+    directory = tmp_path / "0001_WAT"
+    directory.mkdir()
+    (directory / "0001_WAT.xyz").write_text("0")
+    shutil.make_archive(str(directory), 'zip', str(tmp_path), "0001_WAT")
+    shutil.rmtree(str(directory))
+
+    assert workspace.unpack("0001_WAT")
+    assert os.path.exists(workspace.file("0001_WAT", ".xyz"))
+    assert not os.path.exists(workspace.path("0001_WAT.zip"))
+
+
+def test_open_missing_file(tmp_path):
+    workspace = Workspace(str(tmp_path))
+    assert not workspace.exists("0001_WAT", "0001_WAT.xyz")
+    with pytest.raises(FileNotFoundError):
+        workspace.open("0001_WAT", "0001_WAT.xyz")
+
+
+def test_job_directory_restores_cwd(tmp_path):
+    workspace = Workspace(str(tmp_path))
+    cwd = os.getcwd()
+    with workspace.job_directory("0001_WAT") as path:
+        assert os.getcwd() == path == workspace.path("0001_WAT")
+    assert os.getcwd() == cwd
+
+    with pytest.raises(ValueError):
+        with workspace.job_directory("0001_WAT"):
+            raise ValueError()
+    assert os.getcwd() == cwd
+
+
+def write_text(text):
+    def write(filename):
+        with open(filename, 'w') as f:
+            f.write(text)
+    return write
+
+
+def test_write_input_only_when_changed(tmp_path):
+    workspace = Workspace(str(tmp_path))
+    filename = workspace.file("0001_WAT", ".xyz")
+    workspace.write_input("0001_WAT", "0001_WAT.xyz", write_text("a"), "digest-a")
+    workspace.save()
+    mtime = os.stat(filename).st_mtime_ns
+
+    # the manifest is read again by the next run
+    workspace = Workspace(str(tmp_path))
+    workspace.write_input("0001_WAT", "0001_WAT.xyz", write_text("never written"), "digest-a")
+    workspace.flush()
+    assert os.stat(filename).st_mtime_ns == mtime
+
+    workspace.write_input("0001_WAT", "0001_WAT.xyz", write_text("b"), "digest-b")
+    workspace.flush()
+    with open(filename) as f:
+        assert f.read() == "b"
+
+    # a file changed since it was written is written again
+    with open(filename, 'w') as f:
+        f.write("changed")
+    workspace.write_input("0001_WAT", "0001_WAT.xyz", write_text("b"), "digest-b")
+    workspace.flush()
+    with open(filename) as f:
+        assert f.read() == "b"
+
+
+def test_write_input_in_archive(tmp_path):
+    workspace = Workspace(str(tmp_path))
+    workspace.write_input("0001_WAT", "0001_WAT.xyz", write_text("a"), "digest-a")
+    workspace.pack(["0001_WAT"])
+
+    workspace.write_input("0001_WAT", "0001_WAT.xyz", write_text("a"), "digest-a", materialize=False)
+    workspace.flush()
+    assert not os.path.exists(workspace.path("0001_WAT"))
+
+    workspace.write_input("0001_WAT", "0001_WAT.xyz", write_text("a"), "digest-a")
+    workspace.flush()
+    assert os.path.exists(workspace.file("0001_WAT", ".xyz"))
+
+
+def test_write_input_by_content(tmp_path):
+    workspace = Workspace(str(tmp_path))
+    filename = workspace.path("0001_WAT", "temp.pot")
+    digest = workspace.write_input("0001_WAT", "temp.pot", write_text("pot"))
+    mtime = os.stat(filename).st_mtime_ns
+
+    assert workspace.write_input("0001_WAT", "temp.pot", write_text("pot")) == digest
+    assert os.stat(filename).st_mtime_ns == mtime
+    assert os.listdir(workspace.path("0001_WAT")) == ["temp.pot"]
+    assert workspace.write_input("0001_WAT", "temp.pot", write_text("other")) != digest
+
+
+def test_pack_appends_to_archive(tmp_path):
+    workspace = Workspace(str(tmp_path))
+    workspace.directory("0001_WAT")
+    with open(workspace.file("0001_WAT", ".xyz"), 'w') as f:
+        f.write("0001_WAT" * 100)
+    workspace.pack(["0001_WAT"])
+    first_chunk = workspace.archive.chunk_filenames()
+    inode = os.stat(first_chunk[0]).st_ino
+
+    workspace.directory("0002_WAT")
+    with open(workspace.file("0002_WAT", ".xyz"), 'w') as f:
+        f.write("0002_WAT")
+    workspace.pack(["0002_WAT"])
+    assert workspace.archive.chunk_filenames()[:1] == first_chunk
+    assert os.stat(first_chunk[0]).st_ino == inode  # not rewritten
+    assert workspace.archive.names() == ["0001_WAT/0001_WAT.xyz", "0002_WAT/0002_WAT.xyz"]
+    assert workspace.archive.directories() == ["0001_WAT", "0002_WAT"]
+    assert workspace.archive.directory_names("0002_WAT") == ["0002_WAT/0002_WAT.xyz"]
+
+    # packing the same (large) files again eventually compacts the archive
+    sizes = []
+    for i in range(6):
+        data = os.urandom(4000)
+        workspace.directory("0001_WAT")
+        with open(workspace.file("0001_WAT", ".xyz"), 'wb') as f:
+            f.write(data)
+        workspace.pack(["0001_WAT"])
+        sizes.append(workspace.archive.get_size())
+    assert max(sizes) < 3 * sizes[0]
+    with workspace.open("0001_WAT", "0001_WAT.xyz", mode='rb') as f:
+        assert f.read() == data
+    assert Workspace(str(tmp_path)).archive.names() == ["0001_WAT/0001_WAT.xyz", "0002_WAT/0002_WAT.xyz"]
+
+
+def test_pack_interrupted(tmp_path, monkeypatch):
+    workspace = Workspace(str(tmp_path))
+    for name in ["0001_WAT", "0002_WAT"]:
+        workspace.directory(name)
+        with open(workspace.file(name, ".xyz"), 'w') as f:
+            f.write(name)
+    workspace.pack(["0001_WAT"])
+
+    # the run is stopped while the second directory is compressed
+    def interrupt(filename, compresslevel):
+        raise KeyboardInterrupt()
+
+    monkeypatch.setattr(spectre.archive, "_compress_file", interrupt)
+    with pytest.raises(KeyboardInterrupt):
+        workspace.pack(["0002_WAT"])
+    monkeypatch.undo()
+    assert os.path.isdir(workspace.path("0002_WAT"))  # not removed
+
+    # a chunk cut short by a crash (not moved in place) is left behind
+    chunk = workspace.archive.chunk_filenames()[-1]
+    with open(chunk, 'rb') as f:
+        data = f.read()
+    with open(os.path.join(str(tmp_path), "workspace.zip.abc.tmp"), 'wb') as f:
+        f.write(data[:len(data) // 2])
+
+    workspace = Workspace(str(tmp_path))
+    assert workspace.archive.names() == ["0001_WAT/0001_WAT.xyz"]
+    workspace.pack(["0002_WAT"])
+    assert Workspace(str(tmp_path)).archive.names() == ["0001_WAT/0001_WAT.xyz", "0002_WAT/0002_WAT.xyz"]
+    with workspace.open("0001_WAT", "0001_WAT.xyz") as f:
+        assert f.read() == "0001_WAT"
+
+
+def test_pack_in_background(tmp_path):
+    workspace = Workspace(str(tmp_path))
+    for name in ["0001_WAT", "0002_WAT"]:
+        workspace.directory(name)
+        with open(workspace.file(name, ".xyz"), 'w') as f:
+            f.write(name)
+
+    workspace.pack(["0001_WAT"], background=True)
+    with workspace.open("0001_WAT", "0001_WAT.xyz") as f:  # from disk or the archive
+        assert f.read() == "0001_WAT"
+    workspace.pack(["0002_WAT"])  # waits for the earlier packing
+    assert not os.path.exists(workspace.path("0001_WAT"))
+    assert workspace.archive.names() == ["0001_WAT/0001_WAT.xyz", "0002_WAT/0002_WAT.xyz"]
+    workspace.wait_packing()
+
+
+def test_archive_readable_while_packing(tmp_path, monkeypatch):
+    workspace = Workspace(str(tmp_path))
+    for name in ["0001_WAT", "0002_WAT"]:
+        workspace.directory(name)
+        with open(workspace.file(name, ".xyz"), 'w') as f:
+            f.write(name)
+    workspace.pack(["0001_WAT"])
+
+    compressing = threading.Event()
+    proceed = threading.Event()
+    compress_file = spectre.archive._compress_file
+
+    def slow_compress(filename, compresslevel):
+        compressing.set()
+        assert proceed.wait(5.0)
+        return compress_file(filename, compresslevel)
+
+    monkeypatch.setattr(spectre.archive, "_compress_file", slow_compress)
+    workspace.pack(["0002_WAT"], background=True)
+    assert compressing.wait(5.0)
+    with workspace.open("0001_WAT", "0001_WAT.xyz") as f:  # not blocked by the compression
+        assert f.read() == "0001_WAT"
+    assert workspace.exists("0001_WAT", "0001_WAT.xyz")
+    proceed.set()
+    workspace.wait_packing()
+    assert workspace.archive.names() == ["0001_WAT/0001_WAT.xyz", "0002_WAT/0002_WAT.xyz"]